@@ -0,0 +1,378 @@
+#!/usr/bin/env python
+
+"""
+Process a backlog of coverage counts, i.e. every month (or week) of
+a date range for a set of query parameter combinations, within a pool
+of long-lived worker processes.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+import os
+import time
+import traceback
+
+from cophub.sara import query, query_many
+from cophub.manifest import (job_key, job_manifest, result_hash, file_hash,
+                             is_current)
+
+FREQUENCIES = {
+    'monthly': ('MS', '%Y-%m'),
+    'weekly': ('W-MON', '%Y-%m-%d')
+}
+
+Job = namedtuple('Job', ['collection', 'query_params', 'outdir',
+                         'polygon_fname'])
+Result = namedtuple('Result', ['job', 'status', 'out_fname', 'duration',
+                               'error', 'query_hash', 'content_hash',
+                               'message'])
+
+# the non-trivial defaults of `count_overlaps.run`
+RUN_DEFAULTS = {'fmt': 'GeoJSON'}
+
+
+def date_windows(start, end, frequency='monthly'):
+    """
+    Partition a date range into consecutive windows.
+
+    :param start:
+        A string containing the start date, i.e. '2014-10-01'.
+
+    :param end:
+        A string containing the end date, i.e. '2018-11-01'.
+
+    :param frequency:
+        Either 'monthly' or 'weekly'. Default is 'monthly'.
+
+    :return:
+        A list of (start_date, end_date, label) tuples, where label
+        is the '%Y-%m' (monthly) or '%Y-%m-%d' (weekly) of the window.
+    """
+    import pandas
+
+    freq, label_fmt = FREQUENCIES[frequency]
+    dates = pandas.date_range(start=start, end=end, freq=freq)
+
+    windows = []
+    for i in range(1, len(dates)):
+        windows.append((dates[i-1].strftime('%Y-%m-%d'),
+                        dates[i].strftime('%Y-%m-%d'),
+                        dates[i-1].strftime(label_fmt)))
+
+    return windows
+
+
+def backlog_jobs(collection, start, end, outdir, combinations=None,
+                 frequency='monthly', polygon_fname=None):
+    """
+    Define the jobs for every date window and query parameter
+    combination. The outputs for each window are written to a
+    sub-directory of `outdir` named by the window label.
+
+    :param collection:
+        A string containing the Collection as defined in SARA.
+
+    :param start:
+        A string containing the start date, i.e. '2014-10-01'.
+
+    :param end:
+        A string containing the end date, i.e. '2018-11-01'.
+
+    :param outdir:
+        A string containing the path name to the base output directory.
+
+    :param combinations:
+        A list of lists of 'name=value' query parameter strings, i.e.
+        [['productType=GRD', 'sensorMode=IW'], ...].
+        Default is None, i.e. a single job per date window.
+
+    :param frequency:
+        Either 'monthly' or 'weekly'. Default is 'monthly'.
+
+    :param polygon_fname:
+        See `count_overlaps.query`.
+
+    :return:
+        A list of `Job`'s.
+    """
+    if not combinations:
+        combinations = [[]]
+
+    jobs = []
+    for start_date, end_date, label in date_windows(start, end, frequency):
+        for combination in combinations:
+            query_params = ["startDate={}".format(start_date),
+                            "completionDate={}".format(end_date)]
+            query_params.extend(combination)
+            jobs.append(Job(collection, query_params,
+                            str(Path(outdir, label)), polygon_fname))
+
+    return jobs
+
+
+def _options(kwargs):
+    """
+    The keyword arguments of `count_overlaps.run` that affect the
+    content of the output, used as part of the job key. Options left
+    at their default (None, False, an empty list or `RUN_DEFAULTS`)
+    are omitted, so that a job has the same key whether the defaults
+    are given explicitly, as by `cophub_overlaps`, or not.
+    """
+    ignore = ('cache', 'catalogue', 'workers', 'tile_size')
+
+    options = {}
+    for name, value in kwargs.items():
+        if name in ignore or value is None or value is False:
+            continue
+        if value == [] or RUN_DEFAULTS.get(name) == value:
+            continue
+        options[name] = value
+
+    return options
+
+
+def key(job, **kwargs):
+    """
+    The manifest key of a job. See `manifest.job_key`.
+    """
+    return job_key(job.collection, job.query_params, job.outdir,
+                   job.polygon_fname, _options(kwargs))
+
+
+def run_job(job, previous=None, force=False, query_result=None, **kwargs):
+    """
+    Run a single job, capturing its duration and any failure.
+    If the job's `previous` manifest record shows it completed for an
+    identical query result, and its output still exists, the counting
+    is skipped.
+
+    :param job:
+        A `Job`.
+
+    :param previous:
+        Optional. The job's previous manifest record.
+
+    :param force:
+        If set to True, the job is run regardless of the `previous`
+        record. Default is False.
+
+    :param query_result:
+        Optional. The job's query result, if already fetched, i.e. by
+        `backlog.run_backlog`. Default is None, i.e. the job runs its
+        own query.
+
+    :param kwargs:
+        Additional keyword arguments passed through to
+        `count_overlaps.run`. If a `catalogue` is given, the job's
+        query is answered by the catalogue rather than SARA.
+
+    :return:
+        A `Result`.
+    """
+    # the counting engine is imported here rather than at module load,
+    # so the command line utilities start without the geospatial stack
+    from cophub.count_overlaps import run
+    from cophub.simplify import summary as simplify_summary
+
+    st = time.time()
+    query_hash = None
+    try:
+        catalogue = kwargs.get('catalogue')
+        if query_result is not None:
+            # fetched ahead of the job
+            pass
+        elif catalogue is None:
+            query_result = query(job.collection, list(job.query_params),
+                                 job.polygon_fname, kwargs.get('cache'))
+        else:
+            query_result = catalogue.query(job.collection, job.query_params,
+                                           job.polygon_fname)
+        query_hash = result_hash(query_result)
+
+        if not force and is_current(previous, query_hash):
+            return Result(job, 'skipped', previous['out_fname'],
+                          time.time() - st, None, query_hash,
+                          previous['content_hash'], None)
+
+        out_fname, reduction = run(job.collection, job.query_params,
+                                   job.outdir, job.polygon_fname,
+                                   query_result=query_result, **kwargs)
+        content_hash = file_hash(out_fname)
+    except Exception:
+        return Result(job, 'failed', None, time.time() - st,
+                      traceback.format_exc(), query_hash, None, None)
+
+    message = None
+    if reduction is not None:
+        message = simplify_summary(reduction)
+
+    return Result(job, 'complete', str(out_fname), time.time() - st, None,
+                  query_hash, content_hash, message)
+
+
+def record(result, **kwargs):
+    """
+    Convert a `Result` into a manifest record.
+
+    :param result:
+        A `Result`.
+
+    :param kwargs:
+        The keyword arguments passed through to `count_overlaps.run`,
+        used to determine the job key.
+
+    :return:
+        A dict; see `manifest.Manifest`.
+    """
+    doc = result._asdict()
+    doc.update(result.job._asdict())
+    doc.pop('job')
+    doc['key'] = key(result.job, **kwargs)
+
+    return doc
+
+
+def _prefetch(jobs, query_workers, cache=None):
+    """
+    Fetch the query results of the jobs concurrently, via
+    `sara.query_many`. A query that fails every retry is given a
+    result of None, leaving the job to query, and report the failure,
+    itself.
+    """
+    queries = [(j.collection, j.query_params, j.polygon_fname) for j in jobs]
+    results = query_many(queries, query_workers, cache=cache,
+                         return_exceptions=True)
+
+    return [None if isinstance(r, Exception) else r for r in results]
+
+
+def run_backlog(jobs, workers=None, manifest=True, force=False,
+                query_workers=8, **kwargs):
+    """
+    Run the jobs within a pool of long-lived worker processes, so that
+    the import cost and any warm state is shared across the jobs.
+
+    Unless a `catalogue` is given, the SARA queries are fetched ahead
+    of the counting, in batches, by a pool of `query_workers` threads
+    reusing persistent connections to SARA (see `sara.query_many`).
+    The worker processes then receive the query results, rather than
+    each opening its own connections to SARA.
+
+    With `manifest` set, each job is checked against its previous
+    record in the manifest of its output directory (see
+    `manifest.job_manifest`), as used by `cophub_overlaps`; jobs that
+    completed for an unchanged query result are skipped, while failed,
+    missing or changed jobs are (re)run. Each job is recorded in the
+    manifest as soon as it finishes, so an interrupted run can be
+    resumed.
+
+    :param jobs:
+        A list of `Job`'s, such as returned by `backlog.backlog_jobs`.
+
+    :param workers:
+        The number of worker processes. Default is None, i.e.
+        the number of CPUs on the machine.
+
+    :param manifest:
+        If set to True, the jobs are checked against, and recorded in,
+        the manifests of their output directories. Default is True.
+
+    :param force:
+        If set to True, every job is run regardless of the manifest.
+        Default is False.
+
+    :param query_workers:
+        The number of threads fetching the SARA queries ahead of the
+        counting. Default is 8. If set to 0, each job runs its own
+        query within its worker process.
+
+    :param kwargs:
+        Additional keyword arguments passed through to
+        `count_overlaps.run`, i.e. `cache`, `catalogue`,
+        `premerge_footprints`.
+
+    :return:
+        A list of `Result`'s, in the same order as `jobs`.
+    """
+    manifests = {}
+    records = {}
+    if manifest:
+        for outdir in set(job.outdir for job in jobs):
+            manifests[outdir] = job_manifest(outdir)
+            records.update(manifests[outdir].load())
+
+    prefetch = query_workers and kwargs.get('catalogue') is None
+
+    # fetch the queries in batches, so that the counting starts early,
+    # and only a bounded number of fetched results await a worker
+    batch_size = max(query_workers, workers or os.cpu_count() or 1)
+
+    results = [None] * len(jobs)
+    futures = {}
+
+    def collect(done):
+        for future in done:
+            result = future.result()
+            results[futures.pop(future)] = result
+
+            if manifest:
+                manifests[result.job.outdir].append(record(result, **kwargs))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for first in range(0, len(jobs), batch_size):
+            batch = jobs[first:first + batch_size]
+            query_results = [None] * len(batch)
+            if prefetch:
+                query_results = _prefetch(batch, query_workers,
+                                          kwargs.get('cache'))
+
+            for i, job in enumerate(batch, first):
+                previous = records.get(key(job, **kwargs))
+                future = executor.submit(run_job, job, previous, force,
+                                         query_results[i - first], **kwargs)
+                futures[future] = i
+
+            while len(futures) > batch_size:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                collect(done)
+
+        collect(wait(futures).done)
+
+    return results
+
+
+def summary(results):
+    """
+    Summarise the results of a backlog run.
+
+    :param results:
+        A list of `Result`'s, as returned by `backlog.run_backlog`.
+
+    :return:
+        A string containing the per-job timings and any messages,
+        followed by the errors of any failed jobs.
+    """
+    lines = []
+    for result in results:
+        lines.append("{:>9} {:>9.1f}s  {} {}".format(
+            result.status, result.duration, result.job.collection,
+            " ".join(result.job.query_params)))
+        if result.message:
+            lines.append("{:>22}simplified; {}".format("", result.message))
+
+    failed = [r for r in results if r.status == 'failed']
+    skipped = [r for r in results if r.status == 'skipped']
+    total = sum(r.duration for r in results)
+    lines.append("")
+    lines.append("{} jobs, {} skipped, {} failed, {:.1f}s total job "
+                 "time".format(len(results), len(skipped), len(failed),
+                               total))
+
+    for result in failed:
+        lines.append("")
+        lines.append("Failed: {} {}".format(
+            result.job.collection, " ".join(result.job.query_params)))
+        lines.append(result.error)
+
+    return "\n".join(lines)
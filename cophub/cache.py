@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+
+"""
+A persistent, on-disk cache for SARA query results.
+"""
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+DEFAULT_CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME',
+                                        Path.home().joinpath('.cache')),
+                         'cophub')
+DAY = 24 * 60 * 60
+
+
+class QueryCache:
+    """
+    Cache SARA query results on disk, as gzip compressed JSON documents.
+
+    Entries are keyed by the collection, the sorted query parameters
+    and a hash of the ROI geometry. Each entry expires after a TTL,
+    which is longer for date windows that ended more than
+    `stable_after` days ago, as these rarely change once the archive
+    has caught up. When the total size of the cache exceeds `max_bytes`,
+    the least recently used entries are evicted.
+
+    :param cache_dir:
+        The directory to contain the cache entries.
+        Default is `DEFAULT_CACHE_DIR/queries`.
+
+    :param max_bytes:
+        The maximum total size of the cache entries in bytes.
+        Default is 1 GiB.
+
+    :param ttl:
+        The TTL in seconds for recent date windows, or queries
+        without a `completionDate`. Default is 1 day.
+
+    :param stable_ttl:
+        The TTL in seconds for date windows that ended more than
+        `stable_after` days ago. Default is 365 days.
+
+    :param stable_after:
+        The number of days after which a date window is considered
+        stable. Default is 28.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=1024**3, ttl=DAY,
+                 stable_ttl=365 * DAY, stable_after=28):
+        if cache_dir is None:
+            cache_dir = DEFAULT_CACHE_DIR.joinpath('queries')
+
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stable_ttl = stable_ttl
+        self.stable_after = stable_after
+
+    @staticmethod
+    def key(collection, query_params, roi_wkt=None):
+        """
+        The cache key for a query.
+
+        :param collection:
+            A string containing the Collection as defined in SARA.
+
+        :param query_params:
+            A list of 'name=value' query parameter strings,
+            excluding the ROI geometry.
+
+        :param roi_wkt:
+            Optional. The WKT of the ROI geometry.
+
+        :return:
+            A hex digest string.
+        """
+        roi_hash = None
+        if roi_wkt is not None:
+            roi_hash = hashlib.sha256(roi_wkt.encode('utf-8')).hexdigest()
+
+        doc = json.dumps([collection, sorted(query_params), roi_hash])
+
+        return hashlib.sha256(doc.encode('utf-8')).hexdigest()
+
+    def entry_ttl(self, query_params):
+        """
+        The TTL in seconds for a query, determined by the end of its
+        date window (`completionDate`).
+        """
+        for param in query_params:
+            name, _, value = param.partition('=')
+            if name != 'completionDate':
+                continue
+
+            # SARA dates are UTC
+            try:
+                end = datetime.strptime(value[0:10], '%Y-%m-%d')
+            except ValueError:
+                break
+            end = end.replace(tzinfo=timezone.utc)
+
+            if (datetime.now(timezone.utc) - end >
+                    timedelta(days=self.stable_after)):
+                return self.stable_ttl
+            break
+
+        return self.ttl
+
+    def _fname(self, key):
+        return self.cache_dir.joinpath('{}.json.gz'.format(key))
+
+    def get(self, key):
+        """
+        Retrieve a cached query result.
+
+        :param key:
+            The cache key as returned by `QueryCache.key`.
+
+        :return:
+            The cached GeoJSON dict, or None if there is no entry,
+            or the entry has expired.
+        """
+        fname = self._fname(key)
+
+        try:
+            with gzip.open(str(fname), 'rt') as src:
+                entry = json.load(src)
+        except (OSError, ValueError):
+            return None
+
+        if entry['expires'] < time.time():
+            return None
+
+        # record the access for the LRU eviction
+        os.utime(str(fname))
+
+        return entry['result']
+
+    def put(self, key, result, query_params):
+        """
+        Insert a query result into the cache, evicting the least
+        recently used entries if the cache exceeds its size limit.
+
+        :param key:
+            The cache key as returned by `QueryCache.key`.
+
+        :param result:
+            The GeoJSON dict as returned by `count_overlaps.query`.
+
+        :param query_params:
+            The list of query parameters, used to determine the TTL.
+        """
+        # exist_ok, as entries may be put by concurrent threads
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        entry = {
+            'expires': time.time() + self.entry_ttl(query_params),
+            'result': result
+        }
+
+        # write then rename, so readers never see a partial entry
+        fd, tmp_fname = tempfile.mkstemp(dir=str(self.cache_dir),
+                                         suffix='.tmp')
+        with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt') as dst:
+            json.dump(entry, dst)
+
+        os.replace(tmp_fname, str(self._fname(key)))
+
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the total size
+        of the cache is within `max_bytes`.
+        """
+        entries = []
+        for fname in self.cache_dir.glob('*.json.gz'):
+            try:
+                stat = fname.stat()
+            except FileNotFoundError:
+                # evicted by a concurrent process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, fname))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, fname in sorted(entries):
+            if total <= self.max_bytes:
+                break
+
+            try:
+                fname.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
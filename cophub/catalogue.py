@@ -0,0 +1,481 @@
+#!/usr/bin/env python
+
+"""
+A persistent, local catalogue of acquisition footprints and metadata,
+held in SQLite with an R-tree spatial index.
+
+Products are keyed by their name, i.e. the SAFE/zip name of the
+Sentinel-1 SLC products, or the SARA `title`, and are only added
+if unseen; products ingested from both sources carry the SLC
+attributes and the SARA properties combined. The catalogue answers
+SARA style queries (by date, mode, orbit and bbox) with the same
+GeoJSON structure as `sara.query`, so the counting and backlog tools
+can run from the catalogue rather than re-fetching from SARA.
+"""
+
+from collections import namedtuple
+from pathlib import Path
+import json
+import sqlite3
+import time
+
+from cophub.cache import DEFAULT_CACHE_DIR
+
+DEFAULT_CATALOGUE = DEFAULT_CACHE_DIR.joinpath('catalogue.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    sources TEXT NOT NULL,
+    collection TEXT,
+    product_type TEXT,
+    mode TEXT,
+    orbit_direction TEXT,
+    relative_orbit INTEGER,
+    start_time TEXT,
+    geometry TEXT NOT NULL,
+    properties TEXT NOT NULL,
+    ingested REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS products_start_time ON products (start_time);
+CREATE VIRTUAL TABLE IF NOT EXISTS products_rtree
+    USING rtree(id, minx, maxx, miny, maxy);
+"""
+
+# the SARA properties (and query parameters) of the indexed columns
+SARA_COLUMNS = {
+    'productType': 'product_type',
+    'sensorMode': 'mode',
+    'orbitDirection': 'orbit_direction',
+    'relativeOrbitNumber': 'relative_orbit'
+}
+
+Product = namedtuple('Product', ['name', 'source', 'collection',
+                                 'product_type', 'mode', 'orbit_direction',
+                                 'relative_orbit', 'start_time', 'geometry',
+                                 'properties'])
+
+
+def _coordinates(coords):
+    """
+    Flatten the nested coordinates of a GeoJSON geometry.
+    """
+    if coords and isinstance(coords[0], (int, float)):
+        yield coords
+        return
+
+    for item in coords:
+        yield from _coordinates(item)
+
+
+def bounds(geometry):
+    """
+    The (minx, miny, maxx, maxy) of a GeoJSON geometry dict.
+    """
+    xs, ys = zip(*[c[0:2] for c in _coordinates(geometry['coordinates'])])
+
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def slc_product(record, parts):
+    """
+    Convert the footprint of an SLC product into a catalogue `Product`.
+
+    :param record:
+        A `cophub.slc.Record`.
+
+    :param parts:
+        The polygon parts, as returned by `cophub.slc.product_record`.
+
+    :return:
+        A `Product`.
+    """
+    # the stripmap beams (S1-S6) are queried as sensorMode=SM
+    mode = 'SM' if record.ModeBeam.startswith('S') else record.ModeBeam
+    date = record.Date
+    start_time = "{}-{}-{}T{}".format(date[0:4], date[4:6], date[6:8],
+                                      record.StartTime)
+    rings = [ring + ring[0:1] for ring in parts]
+
+    return Product(Path(record.ZipFile).stem, 'slc', 'S1',
+                   record.ProductTyp, mode, record.Pass,
+                   int(record.RelOrbit), start_time,
+                   {'type': 'Polygon', 'coordinates': rings},
+                   record._asdict())
+
+
+def sara_products(features, collection):
+    """
+    Convert the features of a SARA query result into catalogue
+    `Product`'s. Features without a geometry or title are skipped.
+
+    :param features:
+        A list of GeoJSON features, as returned by `sara.query`.
+
+    :param collection:
+        A string containing the Collection as defined in SARA.
+
+    :return:
+        A list of `Product`'s.
+    """
+    products = []
+    for feature in features:
+        props = feature.get('properties') or {}
+        name = props.get('title')
+        if feature.get('geometry') is None or not name:
+            continue
+
+        orbit = props.get('relativeOrbitNumber')
+        products.append(Product(
+            name, 'sara', collection, props.get('productType'),
+            props.get('sensorMode'), props.get('orbitDirection'),
+            None if orbit is None else int(orbit), props.get('startDate'),
+            feature['geometry'], props))
+
+    return products
+
+
+class Catalogue:
+    """
+    A local catalogue of acquisition footprints in an SQLite database.
+
+    Only the database pathname is held, and a connection opened per
+    operation, so that a `Catalogue` can be passed to worker processes
+    such as those of `backlog.run_backlog`.
+
+    :param fname:
+        The file pathname of the SQLite database, created if it
+        doesn't exist. Default is `DEFAULT_CATALOGUE`.
+    """
+
+    def __init__(self, fname=None):
+        self.fname = Path(DEFAULT_CATALOGUE if fname is None else fname)
+
+    def _connect(self):
+        if not self.fname.parent.exists():
+            self.fname.parent.mkdir(parents=True)
+
+        conn = sqlite3.connect(str(self.fname), timeout=60)
+        # allow the backlog workers to read during an ingest
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+        return conn
+
+    def known(self, names):
+        """
+        The subset of product `names` already within the catalogue.
+        """
+        names = list(names)
+        found = set()
+        conn = self._connect()
+        try:
+            # stay within the SQLite limit on bound parameters
+            for i in range(0, len(names), 500):
+                chunk = names[i:i + 500]
+                sql = "SELECT name FROM products WHERE name IN ({})".format(
+                    ",".join("?" * len(chunk)))
+                found.update(row[0] for row in conn.execute(sql, chunk))
+        finally:
+            conn.close()
+
+        return found
+
+    def add(self, products):
+        """
+        Add products to the catalogue, within a single transaction.
+        Unseen products are inserted. Products already ingested from
+        another source have the new properties merged into their
+        existing properties; their footprint is retained.
+
+        :param products:
+            An iterable of `Product`'s.
+
+        :return:
+            The number of products inserted.
+        """
+        inserted = 0
+        conn = self._connect()
+        try:
+            with conn:
+                for product in products:
+                    row = conn.execute(
+                        "SELECT id, sources, properties FROM products "
+                        "WHERE name = ?", (product.name,)).fetchone()
+
+                    if row is None:
+                        self._insert(conn, product)
+                        inserted += 1
+                        continue
+
+                    pid, sources, properties = row
+                    sources = sources.split(',')
+                    if product.source in sources:
+                        continue
+
+                    properties = json.loads(properties)
+                    properties.update(product.properties)
+                    conn.execute(
+                        "UPDATE products SET sources = ?, properties = ? "
+                        "WHERE id = ?",
+                        (",".join(sorted(sources + [product.source])),
+                         json.dumps(properties), pid))
+        finally:
+            conn.close()
+
+        return inserted
+
+    @staticmethod
+    def _insert(conn, product):
+        cursor = conn.execute(
+            "INSERT INTO products (name, sources, collection, product_type, "
+            "mode, orbit_direction, relative_orbit, start_time, geometry, "
+            "properties, ingested) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (product.name, product.source, product.collection,
+             product.product_type, product.mode, product.orbit_direction,
+             product.relative_orbit, product.start_time,
+             json.dumps(product.geometry), json.dumps(product.properties),
+             time.time()))
+
+        minx, miny, maxx, maxy = bounds(product.geometry)
+        conn.execute("INSERT INTO products_rtree VALUES (?, ?, ?, ?, ?)",
+                     (cursor.lastrowid, minx, maxx, miny, maxy))
+
+    def search(self, collection=None, start=None, end=None,
+               product_type=None, mode=None, orbit_direction=None,
+               relative_orbit=None, bbox=None):
+        """
+        Search the catalogue. All criteria are optional, and combined.
+
+        :param collection:
+            A string containing the Collection as defined in SARA.
+
+        :param start:
+            Products acquired at or after this date, i.e. '2018-01-01'.
+
+        :param end:
+            Products acquired before this date, i.e. '2018-02-01'.
+
+        :param product_type:
+            The product type, i.e. 'SLC' or 'GRD'.
+
+        :param mode:
+            The sensor mode, i.e. 'IW' or 'SM'.
+
+        :param orbit_direction:
+            Either 'Ascending' or 'Descending'.
+
+        :param relative_orbit:
+            The relative orbit number.
+
+        :param bbox:
+            A tuple of (minx, miny, maxx, maxy). Products whose
+            footprint bounds intersect the bbox are returned.
+
+        :return:
+            A list of GeoJSON features, ordered by acquisition time
+            and name.
+        """
+        clauses = []
+        params = []
+        equals = [('collection', collection), ('product_type', product_type),
+                  ('mode', mode), ('orbit_direction', orbit_direction),
+                  ('relative_orbit', relative_orbit)]
+        for column, value in equals:
+            if value is not None:
+                clauses.append("p.{} = ?".format(column))
+                params.append(value)
+
+        if start is not None:
+            clauses.append("p.start_time >= ?")
+            params.append(start)
+
+        if end is not None:
+            clauses.append("p.start_time < ?")
+            params.append(end)
+
+        sql = "SELECT p.name, p.geometry, p.properties FROM products p"
+        if bbox is not None:
+            sql += " JOIN products_rtree r ON r.id = p.id"
+            clauses.append("r.maxx >= ? AND r.minx <= ? AND "
+                           "r.maxy >= ? AND r.miny <= ?")
+            minx, miny, maxx, maxy = bbox
+            params.extend([minx, maxx, miny, maxy])
+
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY p.start_time, p.name"
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+        return [{'type': 'Feature', 'id': name,
+                 'geometry': json.loads(geometry),
+                 'properties': json.loads(properties)}
+                for name, geometry, properties in rows]
+
+    def query(self, collection, query_params, polygon_fname=None):
+        """
+        Answer a SARA query from the catalogue, in place of `sara.query`.
+
+        The `startDate`, `completionDate`, `box` (minx,miny,maxx,maxy)
+        and the `SARA_COLUMNS` query parameters are supported; any
+        other parameter raises a ValueError rather than being ignored.
+
+        :param collection:
+            A string containing the Collection as defined in SARA.
+
+        :param query_params:
+            A list of 'name=value' query parameter strings.
+
+        :param polygon_fname:
+            Optional. A vector file containing the ROI; only products
+            whose footprint intersects the ROI are returned.
+            See `sara.query`.
+
+        :return:
+            A GeoJSON dict, as per `sara.query`.
+        """
+        criteria = {'collection': collection}
+        for param in query_params:
+            name, _, value = param.partition('=')
+            if name == 'startDate':
+                criteria['start'] = value
+            elif name == 'completionDate':
+                criteria['end'] = value
+            elif name == 'box':
+                criteria['bbox'] = tuple(float(v) for v in value.split(','))
+            elif name == 'relativeOrbitNumber':
+                criteria['relative_orbit'] = int(value)
+            elif name in SARA_COLUMNS:
+                criteria[SARA_COLUMNS[name]] = value
+            else:
+                msg = "Query parameter not supported by the catalogue: {}"
+                raise ValueError(msg.format(param))
+
+        roi = None
+        if polygon_fname is not None:
+            from shapely import wkt
+            from cophub.sara import _roi_wkt
+
+            roi = wkt.loads(_roi_wkt(polygon_fname))
+            if 'bbox' not in criteria:
+                criteria['bbox'] = roi.bounds
+
+        features = self.search(**criteria)
+
+        if roi is not None:
+            from shapely.geometry import shape
+            from shapely.prepared import prep
+
+            prepared = prep(roi)
+            features = [f for f in features
+                        if prepared.intersects(shape(f['geometry']))]
+
+        return {
+            "type": "FeatureCollection",
+            "properties": {},
+            "features": features
+        }
+
+    def summary(self):
+        """
+        The number of products per collection, product type and mode.
+
+        :return:
+            A list of (collection, product_type, mode, count) tuples.
+        """
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT collection, product_type, mode, COUNT(*) "
+                "FROM products GROUP BY collection, product_type, mode "
+                "ORDER BY collection, product_type, mode").fetchall()
+        finally:
+            conn.close()
+
+
+def ingest_slc(catalogue, zip_list, sar_dir=None, workers=1, batch_size=1000):
+    """
+    Ingest the SLC products of a zip list into the catalogue; only the
+    products not already within the catalogue are extracted.
+
+    :param catalogue:
+        A `Catalogue`.
+
+    :param zip_list:
+        A zip list for a single month and mode. See
+        `cophub.slc.slc_footprints`.
+
+    :param sar_dir:
+        The base directory of the SLC archive. Default is
+        `cophub.slc.SAR_DIR`.
+
+    :param workers:
+        See `cophub.slc.extract_products`.
+
+    :param batch_size:
+        The number of products added per transaction. Default is 1000.
+
+    :return:
+        A tuple of (number of products listed, number ingested).
+    """
+    from cophub.slc import (SAR_DIR, extract_products, output_name,
+                            read_zip_list)
+
+    if sar_dir is None:
+        sar_dir = SAR_DIR
+
+    yr, yr_mth, _ = output_name(zip_list)
+    listed = read_zip_list(zip_list)
+    known = catalogue.known(Path(zip_file).stem for _, zip_file in listed)
+    jobs = [(str(Path(sar_dir, yr, yr_mth, grid_dir, zip_file)), grid_dir)
+            for grid_dir, zip_file in listed
+            if Path(zip_file).stem not in known]
+
+    inserted = 0
+    batch = []
+    for record, parts in extract_products(jobs, workers):
+        batch.append(slc_product(record, parts))
+        if len(batch) >= batch_size:
+            inserted += catalogue.add(batch)
+            batch = []
+    inserted += catalogue.add(batch)
+
+    return len(listed), inserted
+
+
+def ingest_sara(catalogue, collection, query_params, polygon_fname=None,
+                cache=None):
+    """
+    Query SARA and ingest the unseen products of the result into the
+    catalogue.
+
+    :param catalogue:
+        A `Catalogue`.
+
+    :param collection:
+        A string containing the Collection as defined in SARA.
+
+    :param query_params:
+        A list of 'name=value' query parameter strings.
+
+    :param polygon_fname:
+        See `sara.query`.
+
+    :param cache:
+        See `sara.query`.
+
+    :return:
+        A tuple of (number of products returned, number ingested).
+    """
+    from cophub.sara import query
+
+    result = query(collection, list(query_params), polygon_fname, cache)
+    products = sara_products(result['features'], collection)
+
+    return len(products), catalogue.add(products)
@@ -1,75 +1,206 @@
 #!/usr/bin/env python
 
-import copy
 from pathlib import Path
-import tempfile
-import json
-import fiona
+from concurrent.futures import ProcessPoolExecutor
+import threading
+from queue import Queue
+import numpy
+import pandas
 from fiona.transform import transform_geom
-from shapely.geometry import mapping, MultiPolygon, shape
+from shapely.geometry import box, mapping, shape, MultiPolygon, Polygon
 from shapely.ops import polygonize_full, unary_union
-from auscophub import saraclient
 import geopandas
 
+from cophub.layers import FORMATS, layer_metadata, layer_size, write_layer
+from cophub.simplify import simplify_layer
+from cophub.sara import query
 
-def collection_info():
+CRS = "EPSG:4326"
+
+
+def _prefetch(iterable, maxsize=2):
     """
-    List the available collections and their products.
+    Consume an iterable in a background thread, so that the next
+    items (i.e. query pages) are being fetched while the current
+    item is being processed.
     """
-    collections_url = "https://copernicus.nci.org.au/sara.server/1.0/collections.json"
-    url_opener = saraclient.makeUrlOpener()
-    info, err = saraclient.readJsonUrl(url_opener, collections_url)
+    items = Queue(maxsize)
 
-    if err is None:
-        return info
-    else:
-        raise Exception(err)
+    def producer():
+        try:
+            for item in iterable:
+                items.put((True, item))
+        except Exception as exc:
+            items.put((False, exc))
+        finally:
+            items.put((None, None))
+
+    threading.Thread(target=producer, daemon=True).start()
 
+    while True:
+        ok, item = items.get()
+        if ok is None:
+            break
+        if not ok:
+            raise item
+        yield item
 
-def query(collection, query_params, polygon_fname=None):
+
+def footprints(features, properties=None):
     """
-    Submit the query to SARA and return a GeoJSON document.
+    Construct a GeoDataFrame directly from a list of GeoJSON features,
+    such as the `features` returned by `count_overlaps.query`.
+    Features without a geometry are skipped.
 
-    :param collection:
-        A string containing the Collection as defined in SARA.
+    :param features:
+        A list of GeoJSON feature dicts. The geometries are expected
+        to be in WGS84 Latitude and Longitude coordinates.
 
-    :param query_params:
-        A list containing additional query parameters to be used in
-        querying SARA.
+    :param properties:
+        Optional. A list of property names to carry across as
+        attributes. Default is None, i.e. geometry only.
 
-    :param polygon_fname:
-        A string containing the full file pathname of an OGR compliant
-        vector file. Ideally the vector file will contain a single
-        polygon defining the Region Of Interest (ROI) to spatially
-        constrain the search to.
+    :return:
+        A GeoDataFrame containing the footprint geometries and
+        the requested attributes.
+    """
+    features = [f for f in features if f.get('geometry') is not None]
+    geometries = [shape(f['geometry']) for f in features]
+
+    data = {}
+    for name in properties or []:
+        data[name] = [f['properties'].get(name) for f in features]
+
+    return geopandas.GeoDataFrame(data, geometry=geometries, crs=CRS)
+
+
+def split_dateline(geometries):
     """
-    # search by polygon, startDate, completionDate, collection, productType
-    url_opener = saraclient.makeUrlOpener()
+    Split geometries crossing the dateline along the antimeridian.
+    Crossing geometries are detected in bulk from their coordinate
+    bounds, i.e. a longitudinal extent greater than 180 degrees, or
+    longitudes outside of [-180, 180]. Only those geometries are cut,
+    the remainder are passed through untouched.
 
-    params = copy.copy(query_params)
+    :param geometries:
+        A GeoSeries containing Polygon geometries in WGS84
+        Latitude and Longitude coordinates.
 
-    if polygon_fname is not None:
-        # only deal with the first feature at this point in time
-        with fiona.open(polygon_fname, 'r') as src:
-            feature = src[0]
+    :return:
+        A GeoSeries with the same index as `geometries`, where
+        geometries crossing the dateline are now MultiPolygons.
+    """
+    bounds = geometries.bounds.values
+    minx = bounds[:, 0]
+    maxx = bounds[:, 2]
+    crossing = ((maxx - minx) > 180) | (minx < -180) | (maxx > 180)
 
-        geom = shape(feature['geometry'])
-        params.append("geometry={}".format(geom.wkt))
+    split = list(geometries)
+    for idx in numpy.flatnonzero(crossing):
+        cut = transform_geom(CRS, CRS, mapping(split[idx]),
+                             antimeridian_cutting=True)
+        split[idx] = shape(cut)
 
-    # the searchSara api requires 1, 2 or 3, not S1, S2, or S3
-    sentinel_number = collection[1]
-    results = saraclient.searchSara(url_opener, sentinel_number, params)
+    return geopandas.GeoSeries(split, index=geometries.index,
+                               crs=geometries.crs)
 
-    json_doc = {
-        "type": "FeatureCollection",
-        "properties": {},
-        "features": results
-    }
 
-    return json_doc
+def rings(geometries):
+    """
+    Return the exterior and interior rings of all the (Multi)Polygon
+    geometries contained within a GeoSeries.
+
+    :param geometries:
+        A GeoSeries containing Polygon or MultiPolygon geometries.
+
+    :return:
+        A list of LinearRing's; the exterior of each individual
+        Polygon, followed by any interiors.
+    """
+    polygons = geometries.explode(index_parts=False)
+    interiors = [ring for polygon in polygons for ring in polygon.interiors]
+
+    return list(polygons.exterior) + interiors
+
+
+def premerge(df, group_by=None):
+    """
+    Pre-merge footprints sharing an identical geometry, and optionally
+    an identical region identifier such as the Sentinel-2 MGRS Tile ID
+    or the Sentinel-1 relative orbit and frame, into a single footprint
+    carrying a multiplicity.
+    As only identical geometries are merged, counting the merged
+    footprints weighted by their multiplicity yields the same
+    `observations` as counting every footprint.
+
+    :param df:
+        A GeoDataFrame containing the footprints.
+
+    :param group_by:
+        Optional. A list of column names identifying the region,
+        used in addition to the geometry to group the footprints.
+
+    :return:
+        A GeoDataFrame containing the first footprint of each group,
+        and a `multiplicity` column containing the size of the group.
+    """
+    columns = list(group_by or [])
+    keys = df[columns].fillna('')
+    keys['wkb'] = [geom.wkb for geom in df.geometry]
+    columns.append('wkb')
+
+    first = ~keys.duplicated(columns)
+    multiplicity = keys.groupby(columns, sort=False)['wkb'].transform('count')
+
+    merged = df[first].copy()
+    merged['multiplicity'] = multiplicity[first].values
+
+    return merged
+
+
+def _prepare(query_result, premerge_footprints=False, group_by=None):
+    """
+    Prepare the footprints of a query result for the counting engines.
+    See `count_overlaps._prepare_pages`.
+    """
+    return _prepare_pages([query_result['features']], premerge_footprints,
+                          group_by)
+
+
+def _prepare_pages(pages, premerge_footprints=False, group_by=None):
+    """
+    Prepare the footprints for the counting engines, a page of features
+    at a time; only valid geometries are kept, split along the dateline,
+    and then optionally pre-merged. Returns the split geometries and
+    their multiplicity (None if not pre-merged).
+    """
+    frames = []
+    for features in pages:
+        df = footprints(features, group_by)
+
+        # TODO Look into the cause of invalid geometry and fix if required
+        # only keep valid geometry
+        valid = df[df.is_valid].copy()
+
+        # manual workaround as geopandas returns errors when doing a
+        # unary_union; split geometries along the dateline meridian
+        valid['geometry'] = split_dateline(valid.geometry)
+        frames.append(valid)
+
+    if frames:
+        valid = pandas.concat(frames, ignore_index=True)
+    else:
+        valid = footprints([], group_by)
+
+    weights = None
+    if premerge_footprints or group_by:
+        valid = premerge(valid, group_by)
+        weights = valid['multiplicity'].values
+
+    return valid.geometry, weights
 
 
-def count(query_result):
+def count(query_result, premerge_footprints=False, group_by=None):
     """
     Count Polygon overlaps.
     Only valid geometries will be included in the process.
@@ -83,79 +214,592 @@ def count(query_result):
         * convert to line features (union then preserves nodes)
         * union all line geometries
         * polygonise unioned features (non-overlapping polygons)
-        * create centroids of each non-overlapping polygon
-        * spatial join (centroids contained within overlapping polygons)
+        * create a representative point of each non-overlapping polygon
+        * spatial index query (points contained within overlapping polygons)
         * summarise counts per non-overlapping polygon
 
-    Refined smarts such as merging by a region identifier, i.e.
-    Landsat Path/Row, or Sentinel-2 MGRS Tile ID, could significantly
-    reduce the computational cost, in terms of processing time and
-    memory used.
-    However, the first cut is to have something generic that works
-    across all sensor acquisition footprints.
+    Merging by a region identifier, i.e. Landsat Path/Row, or
+    Sentinel-2 MGRS Tile ID, can significantly reduce the computational
+    cost, in terms of processing time and memory used.
+    See `count_overlaps.premerge`.
 
     :param query_result:
         A GeoJSON dict as returned by `count_overlaps.query`.
 
+    :param premerge_footprints:
+        If set to True, footprints with identical geometries are
+        merged prior to the union. Default is False.
+
+    :param group_by:
+        Optional. A list of property names identifying the region,
+        i.e. the MGRS Tile ID. Implies `premerge_footprints`.
+
     :return:
         A GeoDataFrame containing frequency counts determined by
         overlapping Polygons.
     """
-    # temporarily write the result to disk
-    with tempfile.TemporaryDirectory() as tmpdir:
-        fname = str(Path(tmpdir, 'query.geojson'))
-        with open(fname, 'w') as src:
-            json.dump(query_result, src, indent=4)
+    split, weights = _prepare(query_result, premerge_footprints, group_by)
+
+    return overlap_count(split, weights)
+
+
+def count_stream(pages, premerge_footprints=False, group_by=None):
+    """
+    Count Polygon overlaps from an iterable of pages of features,
+    such as returned by `cophub.sara.iter_query`.
+    The pages are consumed in a background thread, so that each page
+    is validated and split along the dateline while later pages are
+    still arriving. Otherwise as per `count_overlaps.count`.
+
+    :param pages:
+        An iterable yielding lists of GeoJSON features.
 
-        df = geopandas.read_file(fname)
+    :param premerge_footprints:
+        See `count_overlaps.count`.
+
+    :param group_by:
+        See `count_overlaps.count`.
+
+    :return:
+        A GeoDataFrame containing frequency counts determined by
+        overlapping Polygons.
+    """
+    split, weights = _prepare_pages(_prefetch(pages), premerge_footprints,
+                                    group_by)
 
-    # TODO Look into the cause of invalid geometry and fix if required
-    # only keep valid geometry
-    valid = df[df.is_valid].copy()
+    return overlap_count(split, weights)
 
-    # manual workaround as geopandas returns errors when doing a unary_union
-    # split geometries along the dateline meridian
-    # convert geometries to line features (simplest is to use exterior),
+
+def overlap_count(geometries, weights=None):
+    """
+    Count the overlaps of a set of Polygons via the union, polygonise
+    and spatial index query method described in `count_overlaps.count`.
+
+    :param geometries:
+        A GeoSeries containing (Multi)Polygon geometries, already
+        split along the dateline.
+
+    :param weights:
+        Optional. A 1D NumPy array containing the number of
+        observations each geometry represents. Default is None,
+        i.e. one observation per geometry.
+
+    :return:
+        A GeoDataFrame containing the non-overlapping Polygons
+        and their frequency counts, `observations`.
+    """
+    # convert geometries to line features (the polygon rings),
     # that way the union will preserve the nodes
-    exteriors = []
-    for _, row in valid.iterrows():
-        # split any geometries crossing the dateline
-        split = transform_geom(df.crs, df.crs, mapping(row.geometry),
-                               antimeridian_cutting=True)
-
-        geom = shape(split)
-        if isinstance(geom, MultiPolygon):
-            exteriors.extend([g.exterior for g in geom])
-        else:
-            exteriors.append(geom.exterior)
+    lines = rings(geometries)
 
     # union the line features, and convert to polygons
-    union = unary_union(exteriors)
+    union = unary_union(lines)
     result, dangles, cuts, invalids = polygonize_full(union)
 
     # separate the multi-geometry feature into individual features
-    explode = [p for p in result]
+    explode = list(getattr(result, 'geoms', [result]))
 
-    # insert into geopandas and create centroids
+    # insert into geopandas and create representative points; unlike
+    # centroids, these are guaranteed to fall within concave pieces
     non_overlaps = geopandas.GeoDataFrame(
-        {'fid': range(len(explode))}, geometry=explode, crs=df.crs)
-    non_overlaps['centroid'] = non_overlaps.centroid
-    non_overlaps.set_geometry('centroid', inplace=True)
+        geometry=explode, crs=geometries.crs)
+    points = non_overlaps.representative_point()
+
+    # bulk query of the points within the observations, via the spatial
+    # index, and the overlap count per point
+    hits = geometries.sindex.query(points, predicate='within')
+    if weights is None:
+        observations = numpy.bincount(hits[0], minlength=len(non_overlaps))
+    else:
+        weights = numpy.asarray(weights)
+        observations = numpy.bincount(
+            hits[0], weights=weights[hits[1]], minlength=len(non_overlaps)
+        ).astype(weights.dtype)
+
+    # pieces enclosed by, but not covered by any observation are dropped
+    tjoin = non_overlaps[observations > 0].reset_index(drop=True)
+    tjoin.insert(0, 'fid', range(len(tjoin)))
+    tjoin['observations'] = observations[observations > 0]
+
+    return tjoin
+
 
-    # spatial join (centroids within observations)
-    sjoin = geopandas.sjoin(non_overlaps, valid, how='left', op='within')
+def tiles(bounds, tile_size):
+    """
+    Partition a bounding box into a regular grid of square tiles.
+    The grid is anchored on multiples of `tile_size` so that the tile
+    edges are independent of the extent of any given query.
+
+    :param bounds:
+        A tuple of (minx, miny, maxx, maxy).
 
-    # overlap count per centroid
-    # overlap_count = sjoin.groupby(['fid']).agg(['count'])
-    overlap_count = sjoin.groupby(['fid']).size().reset_index(name='observations')
-    overlap_count.set_index('fid', inplace=True)
+    :param tile_size:
+        The width and height of each tile in degrees.
 
-    # table join the centroid overlap count with the non-overlapping geometry
-    non_overlaps.set_geometry('geometry', inplace=True)
-    tjoin = non_overlaps.join(overlap_count, on='fid')
+    :return:
+        A list of shapely Polygons; one per tile.
+    """
+    minx, miny, maxx, maxy = bounds
+    xs = numpy.arange(numpy.floor(minx / tile_size) * tile_size, maxx,
+                      tile_size)
+    ys = numpy.arange(numpy.floor(miny / tile_size) * tile_size, maxy,
+                      tile_size)
 
-    # reset the non-overlapping polygons as the geometry source for the dataframe
-    tjoin.set_geometry('geometry', inplace=True)
-    tjoin.drop('centroid', axis=1, inplace=True)
+    return [box(x, y, x + tile_size, y + tile_size) for y in ys for x in xs]
+
+
+def _polygonal(geom):
+    """
+    Return only the polygonal parts of a geometry resulting from
+    an intersection, or None if there are none.
+    """
+    if isinstance(geom, (Polygon, MultiPolygon)):
+        return None if geom.is_empty else geom
+
+    parts = [g for g in getattr(geom, 'geoms', [])
+             if isinstance(g, (Polygon, MultiPolygon)) and not g.is_empty]
+    if not parts:
+        return None
+
+    return unary_union(parts)
+
+
+def _count_tile(tile, geometries, weights=None):
+    """
+    Worker for `count_overlaps.count_tiled`; counts the overlaps of
+    the footprints clipped to a single tile, and flags the pieces
+    touching the tile edges as seam pieces.
+    """
+    tjoin = overlap_count(geopandas.GeoSeries(geometries, crs=CRS), weights)
+    tjoin['seam'] = tjoin.intersects(tile.exterior)
 
     return tjoin
+
+
+def count_tiled(query_result, tile_size=10.0, workers=None,
+                premerge_footprints=False, group_by=None):
+    """
+    Count Polygon overlaps using a tiled, multi-process engine.
+    The footprints are clipped to a regular grid of tiles, and each
+    tile is counted independently (as per `count_overlaps.count`)
+    within a process pool. Pieces sharing a tile seam and the same
+    count are then dissolved, so the result follows the same schema
+    as `count_overlaps.count`.
+
+    :param query_result:
+        A GeoJSON dict as returned by `count_overlaps.query`.
+
+    :param tile_size:
+        The width and height of each tile in degrees. Default is 10.
+
+    :param workers:
+        The number of worker processes. Default is None, i.e.
+        the number of CPUs on the machine.
+
+    :param premerge_footprints:
+        See `count_overlaps.count`.
+
+    :param group_by:
+        See `count_overlaps.count`.
+
+    :return:
+        A GeoDataFrame containing frequency counts determined by
+        overlapping Polygons.
+    """
+    split, weights = _prepare(query_result, premerge_footprints, group_by)
+
+    if split.empty:
+        return geopandas.GeoDataFrame(
+            {'fid': [], 'observations': []}, geometry=[], crs=CRS)
+
+    # clip the footprints to each tile; tiles without footprints are skipped
+    sindex = split.sindex
+    jobs = []
+    for tile in tiles(split.total_bounds, tile_size):
+        idx = list(sindex.intersection(tile.bounds))
+        if not idx:
+            continue
+
+        clipped = [_polygonal(g.intersection(tile)) for g in split.iloc[idx]]
+        keep = [i for i, g in enumerate(clipped) if g is not None]
+        if not keep:
+            continue
+
+        tile_weights = None if weights is None else weights[idx][keep]
+        jobs.append((tile, [clipped[i] for i in keep], tile_weights))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_count_tile, *job) for job in jobs]
+        results = [f.result() for f in futures]
+
+    pieces = pandas.concat(results, ignore_index=True)
+
+    # dissolve the pieces split by the tile seams
+    seams = pieces[pieces['seam']]
+    geoms = list(pieces[~pieces['seam']].geometry)
+    observations = list(pieces[~pieces['seam']].observations)
+    for obs, group in seams.groupby('observations'):
+        dissolved = unary_union(list(group.geometry))
+        parts = getattr(dissolved, 'geoms', [dissolved])
+        geoms.extend(parts)
+        observations.extend([obs] * len(parts))
+
+    tjoin = geopandas.GeoDataFrame(
+        {'fid': range(len(geoms))}, geometry=geoms, crs=CRS)
+    tjoin['observations'] = observations
+
+    return tjoin
+
+
+def raster_grid(bounds, resolution):
+    """
+    Define a raster grid, aligned on multiples of `resolution`,
+    that covers a bounding box.
+
+    :param bounds:
+        A tuple of (minx, miny, maxx, maxy).
+
+    :param resolution:
+        The pixel size in degrees.
+
+    :return:
+        A tuple of (transform, width, height), where transform is
+        an affine.Affine.
+    """
+    from rasterio.transform import from_origin
+
+    minx, miny, maxx, maxy = bounds
+    left = numpy.floor(minx / resolution) * resolution
+    top = numpy.ceil(maxy / resolution) * resolution
+    width = max(int(numpy.ceil((maxx - left) / resolution)), 1)
+    height = max(int(numpy.ceil((top - miny) / resolution)), 1)
+    transform = from_origin(left, top, resolution, resolution)
+
+    return transform, width, height
+
+
+def raster_blocks(geometries, transform, width, height, block_rows=1024,
+                  weights=None):
+    """
+    Burn each geometry into an integer accumulator, one block of rows
+    at a time, so that memory stays bounded by the block size rather
+    than the size of the full grid.
+
+    :param geometries:
+        A GeoSeries containing (Multi)Polygon geometries, already
+        split along the dateline.
+
+    :param transform:
+        The affine.Affine of the full grid.
+
+    :param width:
+        The number of columns in the full grid.
+
+    :param height:
+        The number of rows in the full grid.
+
+    :param block_rows:
+        The number of rows to accumulate at a time. Default is 1024.
+
+    :param weights:
+        Optional. A 1D NumPy array containing the number of
+        observations each geometry represents. Default is None,
+        i.e. one observation per geometry.
+
+    :return:
+        A generator yielding tuples of (row_offset, block), where
+        block is a 2D uint32 NumPy array of the observation counts.
+    """
+    from rasterio.enums import MergeAlg
+    from rasterio.features import rasterize
+    from rasterio.transform import from_origin
+
+    sindex = geometries.sindex
+    left = transform.c
+    right = left + width * transform.a
+
+    for row in range(0, height, block_rows):
+        nrows = min(block_rows, height - row)
+        top = transform.f + row * transform.e
+        bottom = top + nrows * transform.e
+        block = numpy.zeros((nrows, width), dtype='uint32')
+
+        idx = list(sindex.intersection((left, bottom, right, top)))
+        if idx:
+            block_transform = from_origin(left, top, transform.a,
+                                          -transform.e)
+            values = [1] * len(idx) if weights is None else weights[idx]
+            shapes = zip(geometries.iloc[idx], values)
+            rasterize(shapes, out=block, transform=block_transform,
+                      merge_alg=MergeAlg.add)
+
+        yield row, block
+
+
+def count_raster(query_result, out_fname, resolution, bounds=None,
+                 block_rows=1024, premerge_footprints=False, group_by=None):
+    """
+    Count Polygon overlaps as a raster of observation counts.
+    Rather than computing the exact non-overlapping Polygons, each
+    valid footprint is burnt into an integer accumulator. Polygon's
+    crossing the dateline are split along the meridian prior to
+    being burnt.
+
+    The output format is determined by the file extension of
+    `out_fname`; `.npz` writes a NumPy archive containing the
+    `observations` array and its GDAL style `geotransform`, anything
+    else is written as a GeoTIFF. The GeoTIFF is written block by
+    block, whereas the NumPy archive requires the full grid in memory.
+
+    :param query_result:
+        A GeoJSON dict as returned by `count_overlaps.query`.
+
+    :param out_fname:
+        A string containing the full file pathname of the output.
+
+    :param resolution:
+        The pixel size in degrees.
+
+    :param bounds:
+        Optional. A tuple of (minx, miny, maxx, maxy) defining the
+        extent of the grid. Default is the extent of the footprints.
+
+    :param block_rows:
+        The number of rows to accumulate at a time. Default is 1024.
+
+    :param premerge_footprints:
+        See `count_overlaps.count`.
+
+    :param group_by:
+        See `count_overlaps.count`.
+
+    :return:
+        None. Outputs are written to disk.
+    """
+    import rasterio
+    from rasterio.windows import Window
+
+    split, weights = _prepare(query_result, premerge_footprints, group_by)
+    nonempty = ~split.is_empty.values
+    split = split[nonempty]
+    if weights is not None:
+        weights = weights[nonempty]
+
+    if bounds is None:
+        bounds = split.total_bounds if not split.empty else (-180, -90, 180, 90)
+
+    transform, width, height = raster_grid(bounds, resolution)
+    blocks = raster_blocks(split, transform, width, height, block_rows,
+                           weights)
+
+    if str(out_fname).endswith('.npz'):
+        observations = numpy.zeros((height, width), dtype='uint32')
+        for row, block in blocks:
+            observations[row:row + block.shape[0]] = block
+
+        numpy.savez_compressed(str(out_fname), observations=observations,
+                               geotransform=transform.to_gdal())
+        return
+
+    kwargs = {
+        'driver': 'GTiff',
+        'width': width,
+        'height': height,
+        'count': 1,
+        'dtype': 'uint32',
+        'crs': CRS,
+        'transform': transform,
+        'nodata': 0,
+        'compress': 'deflate'
+    }
+    with rasterio.open(str(out_fname), 'w', **kwargs) as dst:
+        for row, block in blocks:
+            window = Window(0, row, width, block.shape[0])
+            dst.write(block, 1, window=window)
+
+
+def merge(layers):
+    """
+    Merge several count layers, such as the monthly outputs of
+    `count_overlaps.count`, into a single count layer covering the
+    combined period.
+
+    The non-overlapping Polygons of all layers are overlaid (using
+    the same method as `count_overlaps.count`), and the `observations`
+    of the layers covering each resulting piece are summed.
+    As the pieces within any single layer do not overlap, this is
+    equivalent to counting the raw footprints of the combined period,
+    and allows rolling totals to be maintained by merging the newest
+    month into the previous total.
+
+    :param layers:
+        A list of GeoDataFrames containing non-overlapping Polygons
+        and an `observations` column. Each layer is reprojected to
+        the crs of the first.
+
+    :return:
+        A GeoDataFrame containing the non-overlapping Polygons
+        and their summed frequency counts, `observations`.
+    """
+    crs = layers[0].crs
+    if crs is not None:
+        layers = [layer.to_crs(crs) for layer in layers]
+
+    pieces = pandas.concat([layer[['observations', 'geometry']]
+                            for layer in layers], ignore_index=True)
+    geometries = geopandas.GeoSeries(pieces.geometry, crs=crs)
+
+    return overlap_count(geometries, pieces['observations'].values)
+
+
+def output_fname(outdir, collection, query_params, extension='.geojson'):
+    """
+    The output file pathname for a query, determined from the
+    `collection` and the `query_params`, i.e.
+    "collection=<collection>_<name>=<value>_..."
+
+    :param outdir:
+        A string containing the path name to the output directory.
+
+    :param collection:
+        A string containing the Collection as defined in SARA.
+
+    :param query_params:
+        A list of 'name=value' query parameter strings.
+
+    :param extension:
+        The file extension. Default is '.geojson'.
+
+    :return:
+        A pathlib.Path.
+    """
+    params = "_".join(query_params)
+    out_stem = "collection={}_{}".format(collection, params)
+
+    return Path(outdir).joinpath(out_stem + extension)
+
+
+def run(collection, query_params, outdir, polygon_fname=None, cache=None,
+        tile_size=None, workers=None, raster_resolution=None,
+        premerge_footprints=False, group_by=None, query_result=None,
+        fmt='GeoJSON', precision=None, simplify_tolerance=None,
+        min_area=None, drop_slivers=False, catalogue=None):
+    """
+    Query SARA (or the footprint catalogue), count the overlaps and
+    write the result to disk, as per the `cophub_overlaps` command
+    line utility.
+
+    :param collection:
+        A string containing the Collection as defined in SARA.
+
+    :param query_params:
+        A list containing additional query parameters to be used in
+        querying SARA.
+
+    :param outdir:
+        A string containing the path name to the output directory.
+        The filename is determined by `count_overlaps.output_fname`.
+
+    :param polygon_fname:
+        See `count_overlaps.query`.
+
+    :param cache:
+        See `count_overlaps.query`.
+
+    :param tile_size:
+        If given, the tile size in degrees used by the tiled engine,
+        `count_overlaps.count_tiled`.
+
+    :param workers:
+        The number of worker processes used by the tiled engine.
+
+    :param raster_resolution:
+        If given, the pixel size in degrees of a count raster
+        (`count_overlaps.count_raster`) that is output instead of
+        the count layer.
+
+    :param premerge_footprints:
+        See `count_overlaps.count`.
+
+    :param group_by:
+        See `count_overlaps.count`.
+
+    :param query_result:
+        Optional. The GeoJSON dict of a query that has already been
+        submitted, in which case SARA is not queried again.
+
+    :param fmt:
+        The format of the count layer; one of `layers.FORMATS`.
+        Default is 'GeoJSON'. Ignored for the count raster.
+
+    :param precision:
+        Optional. The number of decimal places retained in the
+        coordinates of the count layer.
+
+    :param simplify_tolerance:
+        Optional. The tolerance in degrees used to simplify the
+        shared boundaries of the count layer.
+
+    :param min_area:
+        Optional. Pieces of the count layer smaller than this area,
+        in square degrees, are merged into a neighbour.
+
+    :param drop_slivers:
+        If set to True, the pieces smaller than `min_area` are dropped
+        rather than merged. Default is False.
+        See `simplify.simplify_layer` for the above four parameters.
+
+    :param catalogue:
+        Optional. A `cophub.catalogue.Catalogue` queried in place of
+        SARA. Ignored if `query_result` is given.
+
+    :return:
+        A tuple of (pathlib.Path of the output file, `Reduction`);
+        the `simplify.Reduction` is None unless the count layer was
+        simplified, in which case it includes the size in bytes of
+        the unsimplified layer and of the written output.
+    """
+    if query_result is None and catalogue is not None:
+        query_result = catalogue.query(collection, query_params,
+                                       polygon_fname)
+    elif query_result is None:
+        query_result = query(collection, list(query_params), polygon_fname,
+                             cache)
+
+    outdir = Path(outdir)
+    if not outdir.exists():
+        outdir.mkdir(parents=True)
+
+    if raster_resolution is not None:
+        out_fname = output_fname(outdir, collection, query_params, '.tif')
+        count_raster(query_result, out_fname, raster_resolution,
+                     premerge_footprints=premerge_footprints,
+                     group_by=group_by)
+        return out_fname, None
+
+    if tile_size is None:
+        features_count = count(query_result, premerge_footprints, group_by)
+    else:
+        features_count = count_tiled(query_result, tile_size, workers,
+                                     premerge_footprints, group_by)
+
+    metadata = layer_metadata(collection, query_params)
+
+    reduction = None
+    if precision is not None or simplify_tolerance or min_area:
+        # the size of the layer as it would have been written
+        bytes_before = layer_size(features_count, fmt, metadata)
+        features_count, reduction = simplify_layer(
+            features_count, simplify_tolerance, precision, min_area,
+            drop_slivers)
+
+    # output the features defined by the union of the acquisition overlaps
+    out_fname = output_fname(outdir, collection, query_params, FORMATS[fmt])
+    write_layer(features_count, out_fname, fmt, metadata)
+
+    if reduction is not None:
+        reduction = reduction._replace(
+            bytes_before=bytes_before,
+            bytes_after=out_fname.stat().st_size)
+
+    return out_fname, reduction
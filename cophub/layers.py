@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+
+"""
+Read and write the count layers output by `cophub_overlaps`, as either
+GeoJSON, or the columnar GeoParquet and Feather (Arrow IPC) formats.
+
+The columnar formats store the geometry as WKB, along with the
+GeoParquet `geo` schema metadata, so they can also be read directly by
+`geopandas.read_parquet` or `geopandas.read_feather`. The metadata
+otherwise encoded in the output filename (the collection and query
+parameters) is embedded within the file under the `cophub` schema
+metadata key.
+"""
+
+from pathlib import Path
+import json
+import os
+import tempfile
+
+FORMATS = {
+    'GeoJSON': '.geojson',
+    'GeoParquet': '.parquet',
+    'Feather': '.feather'
+}
+METADATA_KEY = b'cophub'
+LAYER_CRS = 'EPSG:4326'
+
+
+def layer_format(fname):
+    """
+    The format of a count layer, determined from its file extension.
+
+    :param fname:
+        The file pathname of the count layer.
+
+    :return:
+        A key of `layers.FORMATS`.
+    """
+    suffix = Path(fname).suffix.lower()
+    for fmt, extension in FORMATS.items():
+        if suffix == extension:
+            return fmt
+
+    msg = "Unrecognised count layer format: {}"
+    raise ValueError(msg.format(fname))
+
+
+def layer_metadata(collection, query_params):
+    """
+    The metadata describing a count layer.
+
+    :param collection:
+        A string containing the Collection as defined in SARA.
+
+    :param query_params:
+        A list of 'name=value' query parameter strings.
+
+    :return:
+        A dict containing the `collection` and each query parameter
+        name and value.
+    """
+    metadata = {'collection': collection}
+    for param in query_params:
+        name, _, value = param.partition('=')
+        metadata[name] = value
+
+    return metadata
+
+
+def merged_metadata(metadatas):
+    """
+    The metadata of a count layer merged from several count layers;
+    see `count_overlaps.merge`. The `startDate` and `completionDate`
+    span those of every input, and any other parameter (including the
+    collection) is retained only if it is identical across the inputs.
+
+    :param metadatas:
+        A list of metadata dicts, such as returned by
+        `layers.read_layer`.
+
+    :return:
+        A dict as per `layers.layer_metadata`.
+    """
+    common = dict(metadatas[0]) if metadatas else {}
+    for metadata in metadatas[1:]:
+        common = {k: v for k, v in common.items() if metadata.get(k) == v}
+
+    for name, func in (('startDate', min), ('completionDate', max)):
+        values = [m[name] for m in metadatas if name in m]
+        if values:
+            common[name] = func(values)
+
+    return common
+
+
+def fname_metadata(fname):
+    """
+    The metadata of a count layer as encoded by its filename, which
+    has the format "(<query_param>=<query_value>)_".
+    See `count_overlaps.output_fname`.
+
+    :param fname:
+        The file pathname of the count layer.
+
+    :return:
+        A dict as per `layers.layer_metadata`, which is empty for
+        filenames not in this format, i.e. merged count layers.
+    """
+    # values may themselves contain underscores, i.e. 'OL_1_EFR___',
+    # so rejoin any pieces that aren't a 'name=value' pair
+    params = []
+    for piece in Path(fname).stem.split('_'):
+        if '=' in piece:
+            params.append(piece)
+        elif params:
+            params[-1] = params[-1] + '_' + piece
+
+    return dict([p.split('=', 1) for p in params])
+
+
+def geo_metadata(name, geometry_types, crs=None, bbox=None):
+    """
+    The GeoParquet `geo` schema metadata for a single WKB geometry
+    column.
+
+    :param name:
+        The name of the geometry column.
+
+    :param geometry_types:
+        A list of the geometry types within the column.
+
+    :param crs:
+        Optional. The crs as a PROJJSON dict. If omitted, readers
+        assume longitude/latitude on WGS84 (OGC:CRS84).
+
+    :param bbox:
+        Optional. The (xmin, ymin, xmax, ymax) bounds of the column.
+
+    :return:
+        A dict mapping the `geo` key to the encoded metadata.
+    """
+    column_meta = {
+        'encoding': 'WKB',
+        'geometry_types': sorted(geometry_types),
+    }
+    if crs is not None:
+        column_meta['crs'] = crs
+
+    if bbox is not None:
+        column_meta['bbox'] = [float(v) for v in bbox]
+
+    geo = {
+        'version': '1.0.0',
+        'primary_column': name,
+        'columns': {name: column_meta}
+    }
+
+    return {b'geo': json.dumps(geo).encode('utf-8')}
+
+
+def _to_arrow(gdf, metadata=None):
+    """
+    Convert a GeoDataFrame to a pyarrow.Table with a WKB geometry
+    column and the GeoParquet schema metadata.
+    """
+    import pyarrow
+
+    geometry = gdf.geometry
+    data = {c: gdf[c].values for c in gdf.columns if c != geometry.name}
+    data[geometry.name] = geometry.to_wkb().values
+
+    crs = None if gdf.crs is None else gdf.crs.to_json_dict()
+    bbox = geometry.total_bounds if len(gdf) else None
+    schema_meta = geo_metadata(geometry.name,
+                               set(geometry.geom_type.dropna()), crs, bbox)
+    if metadata is not None:
+        schema_meta[METADATA_KEY] = json.dumps(metadata).encode('utf-8')
+
+    table = pyarrow.table(data)
+
+    return table.replace_schema_metadata(schema_meta)
+
+
+def write_layer(gdf, fname, fmt=None, metadata=None):
+    """
+    Write a count layer to disk.
+
+    :param gdf:
+        A GeoDataFrame, such as returned by `count_overlaps.count`.
+
+    :param fname:
+        The output file pathname.
+
+    :param fmt:
+        A key of `layers.FORMATS`. Default is None, i.e. determined
+        from the extension of `fname`.
+
+    :param metadata:
+        Optional. A dict, such as returned by `layers.layer_metadata`,
+        embedded within the columnar formats. GeoJSON outputs rely
+        on the filename instead.
+
+    Layers are written in `layers.LAYER_CRS`, so that every format
+    of the same data carries the same crs.
+    """
+    if fmt is None:
+        fmt = layer_format(fname)
+
+    if gdf.crs is not None and gdf.crs != LAYER_CRS:
+        gdf = gdf.to_crs(LAYER_CRS)
+
+    if fmt == 'GeoJSON':
+        gdf.to_file(str(fname), driver="GeoJSON")
+    elif fmt == 'GeoParquet':
+        from pyarrow import parquet
+
+        parquet.write_table(_to_arrow(gdf, metadata), str(fname))
+    elif fmt == 'Feather':
+        from pyarrow import feather
+
+        feather.write_feather(_to_arrow(gdf, metadata), str(fname))
+    else:
+        msg = "Unsupported count layer format: {}"
+        raise ValueError(msg.format(fmt))
+
+
+def layer_size(gdf, fmt, metadata=None):
+    """
+    The size in bytes of a count layer, were it written to disk.
+
+    :param gdf:
+        A GeoDataFrame, such as returned by `count_overlaps.count`.
+
+    :param fmt:
+        A key of `layers.FORMATS`.
+
+    :param metadata:
+        See `layers.write_layer`.
+
+    :return:
+        An integer.
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, 'layer' + FORMATS[fmt])
+        write_layer(gdf, fname, fmt, metadata)
+
+        return os.path.getsize(fname)
+
+
+def read_layer(fname):
+    """
+    Read a count layer from disk.
+
+    :param fname:
+        The file pathname of a count layer in any of `layers.FORMATS`.
+
+    :return:
+        A tuple of (GeoDataFrame, metadata dict). The metadata is
+        taken from the file itself where embedded, otherwise from
+        the filename (see `layers.fname_metadata`).
+    """
+    import geopandas
+
+    fmt = layer_format(fname)
+
+    if fmt == 'GeoJSON':
+        return geopandas.read_file(str(fname)), fname_metadata(fname)
+
+    if fmt == 'GeoParquet':
+        from pyarrow import parquet
+
+        schema = parquet.read_schema(str(fname))
+        gdf = geopandas.read_parquet(str(fname))
+    else:
+        from pyarrow import ipc
+
+        with ipc.open_file(str(fname)) as src:
+            schema = src.schema
+        gdf = geopandas.read_feather(str(fname))
+
+    embedded = (schema.metadata or {}).get(METADATA_KEY)
+    if embedded is None:
+        metadata = fname_metadata(fname)
+    else:
+        metadata = json.loads(embedded.decode('utf-8'))
+
+    return gdf, metadata
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+
+"""
+A job manifest recording the outcome of each coverage count job, so
+that interrupted or partially failed runs can be resumed.
+"""
+
+from pathlib import Path
+import hashlib
+import json
+import os
+import time
+
+MANIFEST_FNAME = 'manifest.jsonl'
+
+
+def job_key(collection, query_params, outdir, polygon_fname=None,
+            options=None):
+    """
+    A key identifying a job by its parameters.
+
+    :param collection:
+        A string containing the Collection as defined in SARA.
+
+    :param query_params:
+        A list of 'name=value' query parameter strings.
+
+    :param outdir:
+        A string containing the path name to the output directory.
+        The absolute, normalised path is used, so that the same
+        directory given differently yields the same key.
+
+    :param polygon_fname:
+        Optional. The ROI file pathname.
+
+    :param options:
+        Optional. A dict of any options affecting the output,
+        i.e. `raster_resolution`.
+
+    :return:
+        A hex digest string.
+    """
+    outdir = os.path.normpath(os.path.abspath(str(outdir)))
+    doc = json.dumps([collection, list(query_params), outdir,
+                      polygon_fname, options or {}],
+                     sort_keys=True, default=str)
+
+    return hashlib.sha256(doc.encode('utf-8')).hexdigest()
+
+
+def result_hash(query_result):
+    """
+    A content hash of a query result, used to detect whether
+    the acquisitions for a job have changed since it was last run.
+
+    :param query_result:
+        A GeoJSON dict as returned by `count_overlaps.query`.
+
+    :return:
+        A hex digest string.
+    """
+    doc = json.dumps(query_result['features'], sort_keys=True)
+
+    return hashlib.sha256(doc.encode('utf-8')).hexdigest()
+
+
+def file_hash(fname, blocksize=2**20):
+    """
+    The sha256 hex digest of a file's content.
+    """
+    digest = hashlib.sha256()
+    with open(str(fname), 'rb') as src:
+        for block in iter(lambda: src.read(blocksize), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    A JSON-lines manifest of job records.
+    Records are only ever appended; the last record of a job
+    supersedes any earlier ones.
+
+    Each record contains the job `key`, `collection`, `query_params`,
+    `outdir`, `polygon_fname`, `status` ('complete', 'skipped' or
+    'failed'), `out_fname`, `query_hash`, `content_hash`, `duration`,
+    `error` and `timestamp`.
+
+    :param fname:
+        The file pathname of the manifest, conventionally
+        `MANIFEST_FNAME` within the output directory.
+    """
+
+    def __init__(self, fname):
+        self.fname = Path(fname)
+
+    def load(self):
+        """
+        Read the latest record of every job.
+
+        :return:
+            A dict mapping the job key to its latest record.
+        """
+        records = {}
+        if not self.fname.exists():
+            return records
+
+        with self.fname.open('r') as src:
+            for line in src:
+                line = line.strip()
+                if not line:
+                    continue
+
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # a partially written record from an interrupted run
+                    continue
+
+                records[record['key']] = record
+
+        return records
+
+    def append(self, record):
+        """
+        Append a record to the manifest.
+
+        :param record:
+            A dict as described by `Manifest`. A `timestamp` is
+            added if not present.
+        """
+        if not self.fname.parent.exists():
+            self.fname.parent.mkdir(parents=True)
+
+        record.setdefault('timestamp', time.time())
+        with self.fname.open('a') as dst:
+            dst.write(json.dumps(record, default=str) + '\n')
+            dst.flush()
+
+
+def job_manifest(outdir):
+    """
+    The manifest recording the jobs that write to an output directory;
+    `MANIFEST_FNAME` within `outdir`. Both `cophub_overlaps` and
+    `cophub_backlog` record each job in the manifest of its own output
+    directory, so a job run by either is recognised by the other.
+
+    :param outdir:
+        A string containing the path name to the job's output directory.
+
+    :return:
+        A `Manifest`.
+    """
+    return Manifest(Path(outdir, MANIFEST_FNAME))
+
+
+def is_current(record, query_hash):
+    """
+    Whether a previous record is complete, its output still exists
+    and its query result is unchanged; i.e. the job can be skipped.
+
+    :param record:
+        A manifest record, or None.
+
+    :param query_hash:
+        The hash of the current query result, as returned by
+        `manifest.result_hash`.
+
+    :return:
+        A bool.
+    """
+    if record is None or record['status'] not in ('complete', 'skipped'):
+        return False
+
+    if record['query_hash'] != query_hash:
+        return False
+
+    out_fname = record.get('out_fname')
+
+    return out_fname is not None and Path(out_fname).exists()
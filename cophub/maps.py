@@ -5,56 +5,80 @@ A small util to produce the monthly coverage heat maps for
 the Australasia Copernicus Data Hub.
 """
 
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
 from pathlib import Path
-import matplotlib.pyplot as plt
-import geopandas
-from cartopy import crs as ccrs
+import hashlib
+import json
+import os
+import tempfile
 
+from cophub.cache import DEFAULT_CACHE_DIR
+from cophub.manifest import file_hash
 
-def monthly_coverage(indir, outdir, countries_fname=None):
-    """
-    Produce the monthly coverage heatmaps for the
-    Copernicus Australasia Data Hub.
+TITLE_FMT_LOOKUP = {
+    "S1": "{collection} {product} {mode} {direction} {year_month}",
+    "S2": "{collection} {product} {year_month}",
+    "S3": "{collection} {product} {year_month}"
+}
 
-    :param indir:
-        The input directory that will be globbed for `*.geojson`.
+# these axis limits (xmin, xmax, ymin, ymax) were found by plotting
+# a few examples
+MAP_EXTENT = (-11436864.243194133, 12196121.573371675,
+              -2593925.0238779895, 15765584.618743382)
+FIGSIZE = (6.4, 4.8)
+DPI = 100
+STATE_FNAME = 'maps_state.json'
 
-    :param outdir:
-        The output directory that will contain the maps as PNG's.
+# countries backdrop of each worker process; see `maps._init_worker`
+_WORKER = {}
 
-    :param countries_fname:
-        Optional. A filename to a fiona supported vector file that
-        provides world locational context for the output map.
-        Example, TM_WORLD_BORDERS.
+
+def map_crs():
+    """
+    The output crs, a South Polar Stereographic centred over the
+    Great Australian Bight.
 
     :return:
-        None. Outputs are written to disk.
+        A proj4 string.
     """
-    title_fmt_lookup = {
-        "S1": "{collection} {product} {mode} {direction} {year_month}",
-        "S2": "{collection} {product} {year_month}",
-        "S3": "{collection} {product} {year_month}"
-    }
+    from cartopy import crs as ccrs
 
-    # output crs, centred over the Great Australian Bight
-    crs = ccrs.SouthPolarStereo(131, -32)
-    crs_proj4 = crs.proj4_init
+    return ccrs.SouthPolarStereo(131, -32).proj4_init
 
-    # TM World Borders, or some other countries backdrop
-    if countries_fname is None:
-        tm_gdf = None
-    else:
-        tm_gdf = geopandas.read_file(countries_fname).to_crs(crs_proj4)
 
-    for fname in [f for f in Path(indir).glob('*.geojson')]:
-        gdf = geopandas.read_file(str(fname)).to_crs(crs_proj4)
+def map_period(parts):
+    """
+    The period covered by a count layer; the year and month of its
+    `startDate`, or a range of months for layers spanning several
+    months, such as the rolling totals output by `cophub_merge`.
+    """
+    period = parts['startDate'][0:7]
+    if 'completionDate' in parts:
+        # the completionDate is exclusive
+        end = datetime.strptime(parts['completionDate'][0:10], '%Y-%m-%d')
+        last = (end - timedelta(days=1)).strftime('%Y-%m')
+        if last > period:
+            period = "{} to {}".format(period, last)
 
-        # fname format is "(<query_param>=<query_value>)_"
-        parts = dict([i.split('=') for i in fname.stem.split('_')])
+    return period
 
-        # expected keys are "collection", "startDate", "endDate"
-        title_fmt = title_fmt_lookup[parts['collection']]
-        year_month = parts['startDate'][0:7]
+
+def map_title(parts, default=''):
+    """
+    The title of a map, determined from the metadata of the count
+    layer; see `layers.read_layer`.
+
+    Layers lacking the metadata for their collection's title, such as
+    merged layers spanning several products, or GeoJSON outputs of
+    `cophub_merge`, are given a generic title from whatever metadata
+    is known, otherwise `default`.
+    """
+    # expected keys are "collection", "startDate", "productType", and
+    # for Sentinel-1 "sensorMode" and "orbitDirection"
+    try:
+        title_fmt = TITLE_FMT_LOOKUP[parts['collection']]
+        year_month = map_period(parts)
         if 'sensorMode' in parts:
             # Sentinel-1
             title = title_fmt.format(collection=parts['collection'],
@@ -67,28 +91,685 @@ def monthly_coverage(indir, outdir, countries_fname=None):
             title = title_fmt.format(collection=parts['collection'],
                                      product=parts['productType'],
                                      year_month=year_month)
+    except KeyError:
+        known = [parts[k] for k in ('collection', 'productType')
+                 if k in parts]
+        if 'startDate' in parts:
+            known.append(map_period(parts))
+        title = " ".join(known) or default
+
+    return title
+
+
+def map_window(crs_proj4, extent=MAP_EXTENT, densify=100):
+    """
+    The WGS84 bounding box of the map extent. The edges of the
+    extent are densified before being unprojected, and if either pole
+    falls within the extent, the window spans every longitude.
+
+    :param crs_proj4:
+        The proj4 string of the output crs.
+
+    :param extent:
+        The map extent (xmin, xmax, ymin, ymax) in the output crs.
+
+    :param densify:
+        The number of points sampled along each edge of the extent.
+
+    :return:
+        A shapely Polygon in WGS84 longitude and latitude.
+    """
+    import numpy
+    from pyproj import Transformer
+    from shapely.geometry import box
+
+    to_wgs84 = Transformer.from_crs(crs_proj4, 'EPSG:4326', always_xy=True)
+    xmin, xmax, ymin, ymax = extent
+
+    xs = numpy.linspace(xmin, xmax, densify)
+    ys = numpy.linspace(ymin, ymax, densify)
+    x = numpy.concatenate([xs, numpy.full(densify, xmax), xs[::-1],
+                           numpy.full(densify, xmin)])
+    y = numpy.concatenate([numpy.full(densify, ymin), ys,
+                           numpy.full(densify, ymax), ys[::-1]])
+    lon, lat = to_wgs84.transform(x, y)
+
+    valid = numpy.isfinite(lon) & numpy.isfinite(lat)
+    lon, lat = lon[valid], lat[valid]
+    west, east = lon.min(), lon.max()
+    south, north = lat.min(), lat.max()
+
+    # an edge crossing the antimeridian jumps by ~360 degrees
+    if numpy.any(numpy.abs(numpy.diff(lon)) > 180):
+        west, east = -180.0, 180.0
+
+    to_map = Transformer.from_crs('EPSG:4326', crs_proj4, always_xy=True)
+    for pole in (-90.0, 90.0):
+        px, py = to_map.transform(0.0, pole)
+        if (numpy.isfinite(px) and numpy.isfinite(py) and
+                xmin <= px <= xmax and ymin <= py <= ymax):
+            west, east = -180.0, 180.0
+            south, north = min(south, pole), max(north, pole)
+
+    return box(west, south, east, north)
+
+
+def cull(gdf, window):
+    """
+    Remove the features of a WGS84 GeoDataFrame that fall outside
+    the map window, and clip those straddling its edge, so that only
+    visible geometry is reprojected and drawn.
+
+    :param gdf:
+        A GeoDataFrame in WGS84 longitude and latitude.
+
+    :param window:
+        A shapely Polygon as returned by `maps.map_window`.
+
+    :return:
+        A GeoDataFrame.
+    """
+    idx = gdf.sindex.query(window, predicate='intersects')
+    culled = gdf.iloc[sorted(idx)]
+
+    geometry = culled.geometry
+    straddle = ~geometry.within(window)
+    if straddle.any():
+        geometry = geometry.copy()
+        geometry[straddle] = geometry[straddle].intersection(window)
+        culled = culled.set_geometry(geometry)
+        culled = culled[~culled.geometry.is_empty]
+
+    return culled
+
+
+def load_countries(countries_fname, crs_proj4, window=None):
+    """
+    Read and reproject the countries backdrop.
+
+    :param countries_fname:
+        A filename to a fiona supported vector file, or None.
+
+    :param crs_proj4:
+        The proj4 string of the output crs.
+
+    :param window:
+        Optional. A WGS84 Polygon as returned by `maps.map_window`;
+        only the countries intersecting the window are read (via the
+        fiona bbox filter), and they are clipped to it prior to
+        reprojecting.
+
+    :return:
+        A GeoDataFrame, or None if `countries_fname` is None.
+    """
+    if countries_fname is None:
+        return None
+
+    import geopandas
+
+    if window is None:
+        return geopandas.read_file(countries_fname).to_crs(crs_proj4)
+
+    # a GeoSeries bbox is reprojected to the crs of the file if need be
+    bbox = geopandas.GeoSeries([window], crs='EPSG:4326')
+    tm_gdf = geopandas.read_file(countries_fname, bbox=bbox)
+
+    if tm_gdf.crs is None or tm_gdf.crs.is_geographic:
+        tm_gdf = cull(tm_gdf, window)
+
+    return tm_gdf.to_crs(crs_proj4)
+
+
+def _layout(extent=MAP_EXTENT, figsize=FIGSIZE):
+    """
+    The figure fractions [left, bottom, width, height] of the map axes
+    and the colorbar axes, such that the map axes exactly fit the
+    aspect ratio of the `extent`.
+    """
+    fig_width, fig_height = figsize
+    aspect = (extent[1] - extent[0]) / (extent[3] - extent[2])
+
+    left, width = 0.1, 0.74
+    height = width * fig_width / (fig_height * aspect)
+    bottom = 0.08
+
+    axes_rect = [left, bottom, width, height]
+    cax_rect = [left + width + 0.03, bottom, 0.03, height]
+
+    return axes_rect, cax_rect
+
+
+def render_backdrop(tm_gdf, out_fname, extent=MAP_EXTENT, figsize=FIGSIZE,
+                    dpi=DPI):
+    """
+    Render the countries backdrop to a transparent PNG, sized to fit
+    the map axes of a `MapTemplate` pixel for pixel.
+
+    :param tm_gdf:
+        A GeoDataFrame of the countries backdrop, already projected to
+        the output crs; see `maps.load_countries`.
+
+    :param out_fname:
+        The file pathname of the output PNG.
+
+    :param extent:
+        The map extent (xmin, xmax, ymin, ymax) in the output crs.
+    """
+    import matplotlib.pyplot as plt
+
+    axes_rect, _ = _layout(extent, figsize)
+    size = (axes_rect[2] * figsize[0], axes_rect[3] * figsize[1])
+
+    fig = plt.figure(figsize=size, dpi=dpi)
+    axes = fig.add_axes([0, 0, 1, 1])
+    axes.set_axis_off()
+    tm_gdf.plot(linewidth=0.25, edgecolor='black', facecolor='none',
+                ax=axes)
+    axes.set_xlim(*extent[0:2])
+    axes.set_ylim(*extent[2:4])
+
+    fig.savefig(str(out_fname), dpi=dpi, transparent=True)
+    plt.close(fig)
+
+
+def cached_backdrop(countries_fname, crs_proj4, extent=MAP_EXTENT,
+                    figsize=FIGSIZE, dpi=DPI, cache_dir=None):
+    """
+    The pre-rendered countries backdrop, rendering it only if it
+    is not already cached. The cache is keyed by a hash of the
+    countries file, the output crs, the extent and the figure size.
+
+    :param countries_fname:
+        A filename to a fiona supported vector file.
+
+    :param crs_proj4:
+        The proj4 string of the output crs.
+
+    :param extent:
+        The map extent (xmin, xmax, ymin, ymax) in the output crs.
+
+    :param cache_dir:
+        The directory to contain the backdrops.
+        Default is `DEFAULT_CACHE_DIR/backdrops`.
+
+    :return:
+        The pathlib.Path of the backdrop PNG.
+    """
+    if cache_dir is None:
+        cache_dir = DEFAULT_CACHE_DIR.joinpath('backdrops')
+
+    cache_dir = Path(cache_dir)
+    doc = json.dumps([file_hash(countries_fname), crs_proj4, list(extent),
+                      list(figsize), dpi])
+    key = hashlib.sha256(doc.encode('utf-8')).hexdigest()
+    out_fname = cache_dir.joinpath('{}.png'.format(key))
+
+    if out_fname.exists():
+        return out_fname
+
+    if not cache_dir.exists():
+        cache_dir.mkdir(parents=True)
+
+    # write then rename, so concurrent readers never see a partial PNG
+    fd, tmp_fname = tempfile.mkstemp(dir=str(cache_dir), suffix='.png')
+    os.close(fd)
+    tm_gdf = load_countries(countries_fname, crs_proj4,
+                            map_window(crs_proj4, extent))
+    render_backdrop(tm_gdf, tmp_fname, extent, figsize, dpi)
+    os.replace(tmp_fname, str(out_fname))
+
+    return out_fname
+
+
+def rasterise(gdf, extent, width, height):
+    """
+    Burn the `observations` of a count layer into an array on the
+    output map grid.
+
+    :param gdf:
+        A GeoDataFrame of the count layer, already projected to the
+        output crs.
+
+    :param extent:
+        The map extent (xmin, xmax, ymin, ymax) in the output crs.
+
+    :param width:
+        The number of columns of the output grid.
+
+    :param height:
+        The number of rows of the output grid.
+
+    :return:
+        A 2D NumPy masked array, masked where there are no
+        observations.
+    """
+    import numpy
+    import geopandas
+
+    xmin, xmax, ymin, ymax = extent
+    xres = (xmax - xmin) / width
+    yres = (ymax - ymin) / height
+
+    # sample the layer at the pixel centres; a bulk point in polygon
+    # query of the spatial index is much cheaper than burning in each
+    # of the (many thousands of) pieces individually
+    x = xmin + (numpy.arange(width) + 0.5) * xres
+    y = ymax - (numpy.arange(height) + 0.5) * yres
+    xx, yy = numpy.meshgrid(x, y)
+    points = geopandas.points_from_xy(xx.ravel(), yy.ravel())
+
+    # the pieces don't overlap, so each pixel takes a single value
+    hits = gdf.sindex.query(points, predicate='within')
+    observations = numpy.zeros(width * height, dtype='float32')
+    observations[hits[0]] = gdf['observations'].values[hits[1]]
+    observations = observations.reshape(height, width)
+
+    return numpy.ma.masked_equal(observations, 0)
+
+
+def plot_raster(gdf, axes, cax=None, extent=MAP_EXTENT):
+    """
+    Plot a count layer as a single image, rasterised at the pixel
+    size of the `axes`, with the same colormap, scaling and colorbar
+    as the polygon rendering (`GeoDataFrame.plot`).
+
+    :param gdf:
+        A GeoDataFrame of the count layer, already projected to the
+        output crs.
+
+    :param axes:
+        The matplotlib axes to draw on.
 
+    :param cax:
+        Optional. The axes to draw the colorbar on. Default is None,
+        i.e. take space from `axes`.
 
-        # setup the plot
-        fig, axes = plt.subplots()
+    :param extent:
+        The map extent (xmin, xmax, ymin, ymax) in the output crs.
+
+    :return:
+        The matplotlib AxesImage, or None if `gdf` is empty.
+    """
+    if gdf.empty:
+        return None
+
+    width = max(int(round(axes.bbox.width)), 1)
+    height = max(int(round(axes.bbox.height)), 1)
+    observations = rasterise(gdf, extent, width, height)
+
+    image = axes.imshow(observations, extent=extent, origin='upper',
+                        cmap='rainbow', interpolation='nearest',
+                        vmin=gdf['observations'].min(),
+                        vmax=gdf['observations'].max())
+
+    if cax is None:
+        axes.figure.colorbar(image, ax=axes)
+    else:
+        axes.figure.colorbar(image, cax=cax)
+
+    return image
+
+
+class MapTemplate:
+    """
+    A figure reused to render many maps. The axes, colorbar axes,
+    extent and the pre-rendered backdrop are set up once, so only the
+    coverage layer, colorbar and title are drawn for each map.
+
+    :param backdrop_fname:
+        Optional. The file pathname of a backdrop PNG, as returned by
+        `maps.cached_backdrop`, composited above the coverage.
+
+    :param extent:
+        The map extent (xmin, xmax, ymin, ymax) in the output crs.
+    """
+
+    def __init__(self, backdrop_fname=None, extent=MAP_EXTENT,
+                 figsize=FIGSIZE, dpi=DPI):
+        import matplotlib.pyplot as plt
+
+        self.extent = extent
+        axes_rect, cax_rect = _layout(extent, figsize)
+
+        self.fig = plt.figure(figsize=figsize, dpi=dpi)
+        self.axes = self.fig.add_axes(axes_rect)
+        self.cax = self.fig.add_axes(cax_rect)
+
+        if backdrop_fname is not None:
+            self.axes.imshow(plt.imread(str(backdrop_fname)), extent=extent,
+                             zorder=3, interpolation='none')
+
+        self._reset_extent()
+
+    def _reset_extent(self):
+        self.axes.set_xlim(*self.extent[0:2])
+        self.axes.set_ylim(*self.extent[2:4])
+
+    def render(self, gdf, title, out_fname, render_mode='polygon'):
+        """
+        Render a single map.
+
+        :param gdf:
+            A GeoDataFrame of the count layer, already projected to
+            the output crs.
+
+        :param title:
+            The title of the map.
+
+        :param out_fname:
+            The file pathname of the output PNG.
+
+        :param render_mode:
+            Either 'polygon' or 'raster'; see `maps.render`.
+        """
+        image = None
+        if render_mode == 'raster':
+            image = plot_raster(gdf, self.axes, self.cax, self.extent)
+        else:
+            gdf.plot(column='observations', legend=True, cmap='rainbow',
+                     linewidth=0, ax=self.axes, cax=self.cax)
+        self.axes.set_title(title)
+        self._reset_extent()
+
+        self.fig.savefig(str(out_fname))
+
+        # remove the coverage and colorbar, ready for the next map
+        if image is not None:
+            image.remove()
+        for collection in list(self.axes.collections):
+            collection.remove()
+        self.cax.clear()
+
+
+def render(fname, outdir, tm_gdf=None, crs_proj4=None, template=None,
+           window=None, render_mode='polygon'):
+    """
+    Render the coverage heatmap of a single count layer.
+
+    :param fname:
+        The file pathname of a count layer; see `layers.FORMATS`.
+
+    :param outdir:
+        The output directory that will contain the map as a PNG.
+
+    :param tm_gdf:
+        Optional. A GeoDataFrame of the countries backdrop, already
+        projected to the output crs; see `maps.load_countries`.
+
+    :param crs_proj4:
+        Optional. The proj4 string of the output crs.
+        Default is `maps.map_crs`.
+
+    :param template:
+        Optional. A `MapTemplate` to render the map with, in which
+        case its pre-rendered backdrop is used and `tm_gdf` is ignored.
+
+    :param window:
+        Optional. A WGS84 Polygon as returned by `maps.map_window`;
+        the count layer is culled and clipped to the window prior to
+        reprojecting. See `maps.cull`.
+
+    :param render_mode:
+        Either 'polygon', drawing each piece of the count layer as a
+        patch, or 'raster', rasterising the count layer onto the map
+        grid and drawing it as a single image, which is much faster
+        for large layers. Default is 'polygon'.
+
+    :return:
+        The pathlib.Path of the output PNG.
+    """
+    import matplotlib.pyplot as plt
+    from cophub.layers import read_layer
+
+    if crs_proj4 is None:
+        crs_proj4 = map_crs()
+
+    fname = Path(fname)
+
+    # the metadata is embedded in the columnar formats, otherwise
+    # it is parsed from the fname "(<query_param>=<query_value>)_"
+    gdf, parts = read_layer(fname)
+    if window is not None:
+        gdf = cull(gdf, window)
+    gdf = gdf.to_crs(crs_proj4)
+
+    title = map_title(parts, fname.stem)
+
+    # output filename
+    out_fname = Path(outdir).joinpath('{}.png'.format(fname.stem))
+
+    if template is not None:
+        template.render(gdf, title, out_fname, render_mode)
+        return out_fname
+
+    # setup the plot
+    fig, axes = plt.subplots()
+    if render_mode == 'raster':
+        axes.set_aspect('equal')
+        plot_raster(gdf, axes)
+    else:
         gdf.plot(column='observations', legend=True, cmap='rainbow',
                  linewidth=0, ax=axes)
 
-        if tm_gdf is not None:
-            tm_gdf.plot(linewidth=0.25, edgecolor='black', facecolor='none',
-                        ax=axes)
+    if tm_gdf is not None:
+        tm_gdf.plot(linewidth=0.25, edgecolor='black', facecolor='none',
+                    ax=axes)
+
+    axes.set_title(title)
+
+    axes.set_xlim(*MAP_EXTENT[0:2])
+    axes.set_ylim(*MAP_EXTENT[2:4])
+
+    fig.savefig(out_fname)
+    plt.close(fig)
+
+    return out_fname
+
+
+def _init_worker(countries_fname, backdrop_fname=None):
+    """
+    Initialise a rendering process; select the headless Agg backend,
+    and load the countries backdrop (or figure template) once rather
+    than pickling it along with every task.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+
+    crs_proj4 = map_crs()
+    window = map_window(crs_proj4)
+    _WORKER['crs_proj4'] = crs_proj4
+    _WORKER['window'] = window
+    if backdrop_fname is None:
+        _WORKER['countries'] = load_countries(countries_fname, crs_proj4,
+                                              window)
+        _WORKER['template'] = None
+    else:
+        _WORKER['countries'] = None
+        _WORKER['template'] = MapTemplate(backdrop_fname)
+
+
+def _render_task(fname, outdir, render_mode):
+    """
+    Render a single map within a worker process.
+    """
+    return render(fname, outdir, _WORKER['countries'], _WORKER['crs_proj4'],
+                  _WORKER['template'], _WORKER['window'], render_mode)
+
+
+def load_state(fname):
+    """
+    Read the sidecar state of a map output directory.
+
+    :param fname:
+        The file pathname of the state file, conventionally
+        `STATE_FNAME` within the output directory.
+
+    :return:
+        A dict mapping each input filename to the `maps.render_state`
+        its map was last rendered with. Empty if the state file doesn't
+        exist or is unreadable.
+    """
+    try:
+        with open(str(fname), 'r') as src:
+            return json.load(src)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state, fname):
+    """
+    Write the sidecar state of a map output directory, replacing the
+    file atomically so an interrupted run never leaves it truncated.
+    """
+    fname = Path(fname)
+    fd, tmp_fname = tempfile.mkstemp(dir=str(fname.parent), suffix='.tmp')
+    with os.fdopen(fd, 'w') as dst:
+        json.dump(state, dst, indent=4, sort_keys=True)
+
+    os.replace(tmp_fname, str(fname))
+
+
+def render_state(fname, countries_hash, params):
+    """
+    The state identifying a rendered map; the content hash of the
+    count layer, the hash of the countries backdrop and the rendering
+    parameters.
+    """
+    return {
+        'input_hash': file_hash(fname),
+        'countries_hash': countries_hash,
+        'params': params
+    }
+
+
+def monthly_coverage(indir, outdir, countries_fname=None, workers=1,
+                     cache_backdrop=False, cache_dir=None,
+                     render_mode='polygon', force=False):
+    """
+    Produce the monthly coverage heatmaps for the
+    Copernicus Australasia Data Hub.
+
+    A sidecar state file (`STATE_FNAME`) within `outdir` records the
+    content hash of each input, the countries backdrop and the
+    rendering parameters each map was rendered with. Maps whose
+    inputs and parameters are unchanged, and whose PNG still exists,
+    are skipped.
+
+    :param indir:
+        The input directory that will be globbed for the count
+        layers; `*.geojson`, `*.parquet` and `*.feather`. The maps
+        are named by the stem of each layer, so where a layer exists
+        in several formats, only the first format of `layers.FORMATS`
+        is mapped.
+
+    :param outdir:
+        The output directory that will contain the maps as PNG's.
+
+    :param countries_fname:
+        Optional. A filename to a fiona supported vector file that
+        provides world locational context for the output map.
+        Example, TM_WORLD_BORDERS.
+
+    :param workers:
+        The number of worker processes rendering the maps.
+        Default is 1, i.e. render the maps serially. If None, the
+        number of CPUs on the machine.
+
+    :param cache_backdrop:
+        If set to True, the countries backdrop is pre-rendered once
+        (and cached on disk), and composited onto a reused figure
+        template, rather than plotted for every map. Default is False.
+
+    :param cache_dir:
+        The directory to cache the pre-rendered backdrops in.
+        Default is `DEFAULT_CACHE_DIR/backdrops`.
+
+    :param render_mode:
+        Either 'polygon' or 'raster'; see `maps.render`.
+
+    :param force:
+        If set to True, every map is rendered regardless of the
+        sidecar state. Default is False.
+
+    :return:
+        A list of the pathlib.Path's of the PNG's that were rendered.
+        Outputs are written to disk.
+    """
+    from cophub.layers import FORMATS
+
+    layers = {}
+    for extension in FORMATS.values():
+        for fname in sorted(Path(indir).glob('*' + extension)):
+            layers.setdefault(fname.stem, fname)
+    fnames = sorted(layers.values())
+
+    outdir = Path(outdir)
+    if not outdir.exists():
+        outdir.mkdir(parents=True)
+
+    state_fname = outdir.joinpath(STATE_FNAME)
+    state = load_state(state_fname)
+    countries_hash = None
+    if countries_fname is not None:
+        countries_hash = file_hash(countries_fname)
+    params = {
+        'render_mode': render_mode,
+        'cache_backdrop': cache_backdrop,
+        'extent': list(MAP_EXTENT),
+        'figsize': list(FIGSIZE),
+        'dpi': DPI
+    }
+
+    # determine which maps are out of date
+    pending = {}
+    for fname in fnames:
+        current = render_state(fname, countries_hash, params)
+        out_fname = outdir.joinpath('{}.png'.format(fname.stem))
+        if (force or state.get(fname.name) != current or
+                not out_fname.exists()):
+            pending[fname] = current
+    fnames = list(pending)
+
+    if not fnames:
+        return []
+
+    backdrop_fname = None
+    if cache_backdrop and countries_fname is not None:
+        backdrop_fname = cached_backdrop(countries_fname, map_crs(),
+                                         cache_dir=cache_dir)
+
+    if workers == 1:
+        # the plotting dependencies are slow to import, so only load
+        # them once there is something to plot
+        crs_proj4 = map_crs()
+        window = map_window(crs_proj4)
+        if backdrop_fname is None:
+            tm_gdf = load_countries(countries_fname, crs_proj4, window)
+            template = None
+        else:
+            tm_gdf = None
+            template = MapTemplate(backdrop_fname)
+
+        out_fnames = []
+        for fname in fnames:
+            out_fnames.append(render(fname, outdir, tm_gdf, crs_proj4,
+                                     template, window, render_mode))
+            state[fname.name] = pending[fname]
+            save_state(state, state_fname)
 
-        axes.set_title(title)
+        return out_fnames
 
-        # these axis limits were found by plotting a few examples
-        axes.set_xlim(-11436864.243194133, 12196121.573371675)
-        axes.set_ylim(-2593925.0238779895, 15765584.618743382)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(countries_fname,
+                                       backdrop_fname)) as executor:
+        futures = {executor.submit(_render_task, fname, outdir, render_mode):
+                   fname for fname in fnames}
 
-        # output filename
-        out_fname = Path(outdir).joinpath('{}.png'.format(fname.stem))
-        if not out_fname.parent.exists():
-            out_fname.parent.mkdir()
+        # record each map as it completes, so an interrupted run resumes
+        for future in as_completed(futures):
+            future.result()
+            fname = futures[future]
+            state[fname.name] = pending[fname]
+            save_state(state, state_fname)
 
-        fig.savefig(out_fname)
-        plt.close(fig)
-        # fig = axes = None
+    return [outdir.joinpath('{}.png'.format(f.stem)) for f in fnames]
@@ -0,0 +1,367 @@
+#!/usr/bin/env python
+
+"""
+Query the SARA interface of the Copernicus Australasia Data Hub.
+Only lightweight dependencies are imported at module load, so that
+utilities such as `cophub_info` start quickly; the geospatial
+libraries are only imported when a ROI file is read.
+"""
+
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from http.client import HTTPConnection, HTTPSConnection, HTTPException
+from io import BytesIO
+import threading
+import time
+from urllib.error import HTTPError
+from urllib.parse import quote, urljoin, urlsplit
+from urllib.request import getproxies, proxy_bypass
+from auscophub import saraclient
+
+SARA_URL = "https://copernicus.nci.org.au/sara.server/1.0"
+REDIRECTS = (301, 302, 303, 307, 308)
+
+
+class KeepAliveOpener:
+    """
+    A minimal URL opener, providing the `open(url)` interface of the
+    urllib openers used by `saraclient`, that keeps a persistent
+    HTTP/1.1 connection per host. Successive requests, i.e. the pages
+    of a search, or the queries handled by a `sara.query_many` thread,
+    then reuse the one TCP/TLS connection rather than opening a new
+    one for every request.
+
+    An opener is not thread safe; use one per thread. Proxies aren't
+    supported; see `sara.make_url_opener`.
+
+    :param timeout:
+        The socket timeout in seconds. Default is 60.
+    """
+
+    def __init__(self, timeout=60):
+        self.timeout = timeout
+        self._connections = {}
+
+    def _connection(self, scheme, netloc):
+        key = (scheme, netloc)
+        if key not in self._connections:
+            cls = HTTPSConnection if scheme == 'https' else HTTPConnection
+            self._connections[key] = cls(netloc, timeout=self.timeout)
+
+        return self._connections[key]
+
+    def _get(self, url):
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path = "{}?{}".format(path, parts.query)
+
+        for attempt in range(2):
+            conn = self._connection(parts.scheme, parts.netloc)
+            try:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                return response, response.read()
+            except (HTTPException, OSError):
+                # the server may have closed the idle connection,
+                # so reconnect once before giving up
+                conn.close()
+                del self._connections[(parts.scheme, parts.netloc)]
+                if attempt:
+                    raise
+
+    def open(self, url):
+        """
+        Submit a GET request, following any redirects.
+
+        :return:
+            A file-like object containing the response body.
+            An `urllib.error.HTTPError` is raised for any status
+            other than 200, as per the urllib openers.
+        """
+        for _ in range(5):
+            response, body = self._get(url)
+            if response.status not in REDIRECTS:
+                break
+            url = urljoin(url, response.getheader('Location'))
+
+        if response.status != 200:
+            raise HTTPError(url, response.status, response.reason,
+                            response.headers, BytesIO(body))
+
+        return BytesIO(body)
+
+    def close(self):
+        """
+        Close every connection.
+        """
+        for conn in self._connections.values():
+            conn.close()
+        self._connections = {}
+
+
+def collection_info():
+    """
+    List the available collections and their products.
+    """
+    collections_url = "{}/collections.json".format(SARA_URL)
+    url_opener = saraclient.makeUrlOpener()
+    info, err = saraclient.readJsonUrl(url_opener, collections_url)
+
+    if err is None:
+        return info
+    else:
+        raise Exception(err)
+
+
+@lru_cache(maxsize=None)
+def _roi_wkt(polygon_fname):
+    """
+    Read the ROI geometry as WKT.
+    """
+    import fiona
+    from shapely.geometry import shape
+
+    # only deal with the first feature at this point in time
+    with fiona.open(polygon_fname, 'r') as src:
+        feature = src[0]
+
+    return shape(feature['geometry']).wkt
+
+
+def _search_params(query_params, roi_wkt=None):
+    """
+    Copy the query parameters, appending the ROI geometry if given.
+    """
+    params = copy.copy(query_params)
+
+    if roi_wkt is not None:
+        params.append("geometry={}".format(roi_wkt))
+
+    return params
+
+
+def make_url_opener(url=SARA_URL):
+    """
+    Create a URL opener for querying SARA. A `sara.KeepAliveOpener` is
+    returned, unless a proxy is configured for `url` in the environment
+    (i.e. https_proxy), in which case the proxy handling opener of
+    `saraclient.makeUrlOpener` is returned.
+
+    :param url:
+        The URL of the SARA server. Default is `SARA_URL`.
+    """
+    parts = urlsplit(url)
+    if parts.scheme in getproxies() and not proxy_bypass(parts.hostname):
+        return saraclient.makeUrlOpener()
+
+    return KeepAliveOpener()
+
+
+def query(collection, query_params, polygon_fname=None, cache=None,
+          url_opener=None):
+    """
+    Submit the query to SARA and return a GeoJSON document.
+
+    :param collection:
+        A string containing the Collection as defined in SARA.
+
+    :param query_params:
+        A list containing additional query parameters to be used in
+        querying SARA.
+
+    :param polygon_fname:
+        A string containing the full file pathname of an OGR compliant
+        vector file. Ideally the vector file will contain a single
+        polygon defining the Region Of Interest (ROI) to spatially
+        constrain the search to.
+
+    :param cache:
+        Optional. A `cophub.cache.QueryCache` used to retrieve and
+        store the query result. Default is None, i.e. no caching.
+
+    :param url_opener:
+        Optional. A URL opener as returned by
+        `saraclient.makeUrlOpener`, to be reused across queries.
+        Default is None, i.e. a new opener is created.
+    """
+    roi_wkt = None if polygon_fname is None else _roi_wkt(polygon_fname)
+
+    if cache is not None:
+        key = cache.key(collection, query_params, roi_wkt)
+        json_doc = cache.get(key)
+        if json_doc is not None:
+            return json_doc
+
+    # search by polygon, startDate, completionDate, collection, productType
+    if url_opener is None:
+        url_opener = saraclient.makeUrlOpener()
+
+    params = _search_params(query_params, roi_wkt)
+
+    # the searchSara api requires 1, 2 or 3, not S1, S2, or S3
+    sentinel_number = collection[1]
+    results = saraclient.searchSara(url_opener, sentinel_number, params)
+
+    json_doc = {
+        "type": "FeatureCollection",
+        "properties": {},
+        "features": results
+    }
+
+    if cache is not None:
+        cache.put(key, json_doc, query_params)
+
+    return json_doc
+
+
+def query_many(queries, max_workers=8, retries=3, backoff=1.0, cache=None,
+               return_exceptions=False, opener_factory=make_url_opener):
+    """
+    Submit many queries to SARA concurrently, using a bounded pool of
+    threads. Each thread holds its own URL opener, by default a
+    `sara.KeepAliveOpener`, so that its queries reuse a persistent
+    connection to SARA, and failed queries are retried with an
+    exponential backoff.
+
+    :param queries:
+        A list of (collection, query_params, polygon_fname) tuples,
+        as per the arguments of `sara.query`.
+
+    :param max_workers:
+        The maximum number of concurrent queries. Default is 8.
+
+    :param retries:
+        The number of times a failed query is retried. Default is 3.
+
+    :param backoff:
+        The delay in seconds before the first retry, doubling with
+        each subsequent retry. Default is 1.
+
+    :param cache:
+        Optional. A `cophub.cache.QueryCache`. See
+        `sara.query`.
+
+    :param return_exceptions:
+        If set to True, the last exception of a query failing all
+        retries is returned in place of its result, rather than
+        raised. Default is False.
+
+    :param opener_factory:
+        A callable returning a URL opener, called once per thread.
+        Default is `sara.make_url_opener`, which honours any proxy
+        configured in the environment.
+
+    :return:
+        A list of GeoJSON dicts, in the same order as `queries`.
+        The last exception is raised if a query fails all retries,
+        unless `return_exceptions` is set.
+    """
+    local = threading.local()
+    openers = []
+
+    def submit(args):
+        if not hasattr(local, 'url_opener'):
+            local.url_opener = opener_factory()
+            openers.append(local.url_opener)
+
+        collection, query_params, polygon_fname = args
+        for attempt in range(retries + 1):
+            try:
+                return query(collection, list(query_params), polygon_fname,
+                             cache, local.url_opener)
+            except Exception as exc:
+                if attempt == retries:
+                    if return_exceptions:
+                        return exc
+                    raise
+                time.sleep(backoff * 2 ** attempt)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(submit, queries))
+    finally:
+        for url_opener in openers:
+            if hasattr(url_opener, 'close'):
+                url_opener.close()
+
+
+def iter_query(collection, query_params, polygon_fname=None, page_size=500,
+               url=SARA_URL, url_opener=None):
+    """
+    Submit the query to SARA, yielding the features a page at a time
+    rather than holding the entire result in memory.
+
+    :param collection:
+        A string containing the Collection as defined in SARA.
+
+    :param query_params:
+        A list containing additional query parameters to be used in
+        querying SARA.
+
+    :param polygon_fname:
+        A string containing the full file pathname of an OGR compliant
+        vector file. See `sara.query`.
+
+    :param page_size:
+        The maximum number of features per page. Default is 500.
+        The server may cap this at fewer features.
+
+    :param url:
+        The base URL of the SARA server. Default is `SARA_URL`.
+
+    :param url_opener:
+        Optional. A URL opener, to be reused across the pages.
+        Default is None, i.e. an opener is created by
+        `sara.make_url_opener`, and closed once the query completes.
+
+    :return:
+        A generator yielding lists of GeoJSON features.
+    """
+    # every page is requested over the same connection
+    owned = url_opener is None
+    if owned:
+        url_opener = make_url_opener(url)
+
+    roi_wkt = None if polygon_fname is None else _roi_wkt(polygon_fname)
+
+    params = []
+    for param in _search_params(query_params, roi_wkt):
+        name, value = param.split('=', 1)
+        params.append("{}={}".format(name, quote(value)))
+
+    search_url = "{}/api/collections/{}/search.json".format(url, collection)
+
+    page = 1
+    count = 0
+    try:
+        while True:
+            page_params = params + ["maxRecords={}".format(page_size),
+                                    "page={}".format(page)]
+            page_url = "{}?{}".format(search_url, "&".join(page_params))
+            result, err = saraclient.readJsonUrl(url_opener, page_url)
+
+            if err is not None:
+                raise Exception(err)
+
+            features = result.get('features') or []
+            if features:
+                yield features
+
+            # the server may cap maxRecords below page_size, so the
+            # end of the results is found from its reported paging
+            properties = result.get('properties') or {}
+            total = properties.get('totalResults')
+            per_page = properties.get('itemsPerPage') or page_size
+            count += len(features)
+
+            if len(features) < min(per_page, page_size):
+                break
+            if total is not None and count >= total:
+                break
+
+            page += 1
+    finally:
+        if owned and hasattr(url_opener, 'close'):
+            url_opener.close()
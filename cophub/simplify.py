@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+
+"""
+Reduce the size of the count layers output by `cophub_overlaps`,
+via coordinate quantisation, topology-preserving simplification
+and the removal of sliver pieces.
+
+The pieces of a count layer form a planar partition, so rather than
+simplifying each piece independently (which opens gaps and overlaps
+between neighbours), the shared boundaries are simplified once and
+the pieces rebuilt from them.
+"""
+
+from collections import namedtuple
+import numpy
+from shapely.ops import linemerge, polygonize_full, transform, unary_union
+import geopandas
+
+Reduction = namedtuple('Reduction', ['pieces_before', 'pieces_after',
+                                     'vertices_before', 'vertices_after',
+                                     'bytes_before', 'bytes_after'],
+                       defaults=(None, None))
+
+
+def vertices(geom):
+    """
+    The number of vertices of a (Multi)Polygon.
+    """
+    count = 0
+    for part in getattr(geom, 'geoms', [geom]):
+        count += len(part.exterior.coords)
+        count += sum(len(ring.coords) for ring in part.interiors)
+
+    return count
+
+
+def quantise(geom, precision):
+    """
+    Round the coordinates of a geometry to a number of decimal places.
+    """
+    return transform(lambda x, y: (numpy.round(x, precision),
+                                   numpy.round(y, precision)), geom)
+
+
+def edges(geometries):
+    """
+    The shared boundaries of a set of non-overlapping Polygons, noded
+    and merged into edges running between the junctions of three or
+    more pieces.
+
+    :param geometries:
+        A GeoSeries of (Multi)Polygons forming a planar partition,
+        i.e. the pieces of a count layer.
+
+    :return:
+        A list of LineStrings.
+    """
+    linework = unary_union(list(geometries.boundary))
+    merged = linemerge(linework)
+
+    return list(getattr(merged, 'geoms', [merged]))
+
+
+def simplify_edges(lines, tolerance=None, precision=None):
+    """
+    Simplify and quantise each edge independently. The end points of
+    an edge are retained by the simplification, so neighbouring pieces
+    continue to share the same junctions.
+
+    :param lines:
+        A list of LineStrings, as returned by `simplify.edges`.
+
+    :param tolerance:
+        Optional. The simplification tolerance in degrees.
+
+    :param precision:
+        Optional. The number of decimal places to retain.
+
+    :return:
+        A list of LineStrings.
+    """
+    simplified = []
+    for line in lines:
+        if tolerance:
+            line = line.simplify(tolerance, preserve_topology=True)
+        if precision is not None:
+            line = quantise(line, precision)
+        if not line.is_empty and line.length > 0:
+            simplified.append(line)
+
+    return simplified
+
+
+def rebuild(layer, lines):
+    """
+    Polygonise a set of edges, and transfer the `observations` of the
+    original pieces onto the rebuilt pieces.
+
+    :param layer:
+        A GeoDataFrame containing the original pieces and their
+        `observations`.
+
+    :param lines:
+        A list of LineStrings, as returned by `simplify.simplify_edges`.
+
+    :return:
+        A GeoDataFrame following the same schema as `layer`.
+    """
+    # the simplified edges may now cross, so node them once more
+    result, dangles, cuts, invalids = polygonize_full(unary_union(lines))
+    pieces = geopandas.GeoDataFrame(
+        geometry=list(getattr(result, 'geoms', [result])), crs=layer.crs)
+    points = pieces.representative_point()
+
+    source = numpy.full(len(pieces), -1)
+    hits = layer.sindex.query(points, predicate='within')
+    source[hits[0]] = hits[1]
+
+    # a narrow piece may have shifted enough that its point falls outside
+    # its original piece, so fall back to the majority overlap; holes in
+    # the coverage overlap nothing and are dropped
+    for i in numpy.flatnonzero(source < 0):
+        piece = pieces.geometry.iloc[i]
+        for j in layer.sindex.query(piece, predicate='intersects'):
+            overlap = piece.intersection(layer.geometry.iloc[j]).area
+            if overlap > 0.5 * piece.area:
+                source[i] = j
+                break
+
+    found = source >= 0
+    rebuilt = pieces[found].reset_index(drop=True)
+    rebuilt.insert(0, 'fid', range(len(rebuilt)))
+    rebuilt['observations'] = layer['observations'].values[source[found]]
+
+    return rebuilt
+
+
+def remove_slivers(layer, min_area, drop=False):
+    """
+    Remove the pieces smaller than an area threshold, by merging each
+    into the neighbour with which it shares the longest boundary. The
+    neighbour retains its own `observations`.
+
+    :param layer:
+        A GeoDataFrame containing the pieces of a count layer.
+
+    :param min_area:
+        The area threshold in square degrees.
+
+    :param drop:
+        If set to True, slivers are dropped rather than merged.
+        Slivers without a neighbour larger than `min_area` are
+        always dropped. Default is False.
+
+    :return:
+        A GeoDataFrame following the same schema as `layer`.
+    """
+    small = (layer.geometry.area < min_area).values
+    keep = layer[~small].reset_index(drop=True)
+
+    if not drop and small.any() and not keep.empty:
+        sindex = keep.sindex
+        geoms = list(keep.geometry)
+        merges = {}
+        for sliver in layer.geometry[small]:
+            best, best_length = None, 0.0
+            for i in sindex.intersection(sliver.bounds):
+                shared = sliver.boundary.intersection(geoms[i].boundary)
+                if shared.length > best_length:
+                    best, best_length = i, shared.length
+
+            if best is not None:
+                merges.setdefault(best, []).append(sliver)
+
+        for i, slivers in merges.items():
+            geoms[i] = unary_union([geoms[i]] + slivers)
+
+        keep = keep.set_geometry(geoms, crs=layer.crs)
+
+    keep['fid'] = range(len(keep))
+
+    return keep
+
+
+def simplify_layer(layer, tolerance=None, precision=None, min_area=None,
+                   drop_slivers=False):
+    """
+    Reduce the size of a count layer whilst keeping neighbouring
+    pieces free of gaps and overlaps.
+
+    The shared boundaries of the pieces are simplified (Douglas-Peucker,
+    to within `tolerance`) and quantised (to `precision` decimal places)
+    independently of one another, the pieces rebuilt by polygonising
+    the edges, and finally any pieces smaller than `min_area` are
+    merged into a neighbour or dropped.
+
+    :param layer:
+        A GeoDataFrame as returned by `count_overlaps.count`.
+
+    :param tolerance:
+        Optional. The simplification tolerance in degrees.
+
+    :param precision:
+        Optional. The number of decimal places to retain.
+
+    :param min_area:
+        Optional. The sliver area threshold in square degrees.
+
+    :param drop_slivers:
+        See `simplify.remove_slivers`.
+
+    :return:
+        A tuple of (GeoDataFrame, `Reduction`); the `Reduction`
+        records the number of pieces and vertices before and after.
+        The sizes in bytes are left to the writer of the layer; see
+        `count_overlaps.run`.
+    """
+    simplified = layer
+    if not layer.empty and (tolerance or precision is not None):
+        lines = simplify_edges(edges(layer.geometry), tolerance, precision)
+        simplified = rebuild(layer, lines)
+
+    if min_area and not simplified.empty:
+        simplified = remove_slivers(simplified, min_area, drop_slivers)
+
+    reduction = Reduction(len(layer), len(simplified),
+                          int(sum(vertices(g) for g in layer.geometry)),
+                          int(sum(vertices(g) for g in simplified.geometry)))
+
+    return simplified, reduction
+
+
+def _percent(before, after):
+    return 100.0 * (before - after) / before if before else 0.0
+
+
+def summary(reduction):
+    """
+    Summarise a `Reduction` as a single line.
+
+    :param reduction:
+        A `Reduction`, as returned by `simplify.simplify_layer`, or
+        `count_overlaps.run` with the sizes in bytes.
+    """
+    before, after = reduction.vertices_before, reduction.vertices_after
+
+    msg = "pieces: {} -> {}, vertices: {} -> {} ({:.1f}% fewer)".format(
+        reduction.pieces_before, reduction.pieces_after, before, after,
+        _percent(before, after))
+
+    if reduction.bytes_before is not None:
+        before, after = reduction.bytes_before, reduction.bytes_after
+        msg += ", size: {} -> {} bytes ({:.1f}% smaller)".format(
+            before, after, _percent(before, after))
+
+    return msg
@@ -0,0 +1,703 @@
+#!/usr/bin/env python
+
+"""
+Extract the footprints and metadata of Sentinel-1 SLC products from
+their annotation XML and preview KML, and write the S1 SLC footprint
+layers.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from io import BytesIO
+import os
+from xml.etree.ElementTree import iterparse
+import zipfile
+
+SAR_DIR = "/g/data1/fj7/Copernicus/Sentinel-1/C-SAR/SLC"
+
+WGS84_WKT = ('GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,'
+             '298.257223563]],PRIMEM["Greenwich",0],'
+             'UNIT["degree",0.0174532925199433]]')
+
+# the annotation elements used for the shapefile attributes; the first
+# occurrence of each (within the adsHeader, aside from `pass`) is used
+ANNOTATION_TAGS = ('missionId', 'productType', 'polarisation', 'mode',
+                   'startTime', 'stopTime', 'absoluteOrbitNumber',
+                   'missionDataTakeId', 'pass')
+
+# the shapefile attribute fields, in order; (name, type, size, decimals)
+SCHEMA = (('Mission', 'C', 3, 0), ('ModeBeam', 'C', 2, 0),
+          ('ProductTyp', 'C', 3, 0), ('Date', 'N', 8, 0),
+          ('Pass', 'C', 12, 0), ('Polar', 'C', 6, 0),
+          ('AbOrbit', 'N', 10, 0), ('RelOrbit', 'N', 4, 0),
+          ('Frame', 'N', 4, 0), ('UniqProdID', 'C', 8, 0),
+          ('DatatakeID', 'N', 8, 0), ('ResClass', 'C', 2, 0),
+          ('ProcLevel', 'N', 2, 0), ('ProdClass', 'C', 12, 0),
+          ('StartTime', 'C', 10, 0), ('StopTime', 'C', 10, 0),
+          ('CenLon', 'N', 14, 8), ('CenLat', 'N', 14, 8),
+          ('UL_Lon', 'N', 14, 8), ('UL_Lat', 'N', 14, 8),
+          ('UR_Lon', 'N', 14, 8), ('UR_Lat', 'N', 14, 8),
+          ('LR_Lon', 'N', 14, 8), ('LR_Lat', 'N', 14, 8),
+          ('LL_Lon', 'N', 14, 8), ('LL_Lat', 'N', 14, 8),
+          ('GridDir', 'C', 20, 0), ('ZipFile', 'C', 80, 0))
+
+FIELDS = tuple(field[0] for field in SCHEMA)
+
+Record = namedtuple('Record', FIELDS)
+
+FOOTPRINT_FORMATS = {
+    'Shapefile': '.shp',
+    'GeoPackage': '.gpkg',
+    'GeoParquet': '.parquet'
+}
+
+RESOLUTION_CLASS = {'': '-', 'F': 'Full', 'H': 'High', 'M': 'Medium'}
+
+PRODUCT_CLASS = {'S': 'Standard', 'A': 'Annotation'}
+
+
+def _local_name(tag):
+    """
+    The tag name of an element, without any namespace.
+    """
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_annotation(data, tags=ANNOTATION_TAGS):
+    """
+    Stream parse an annotation XML document, collecting the text of
+    the first occurrence of each of the `tags`. Parsing stops as soon
+    as every tag has been found, so the bulky geolocation grid and
+    burst records at the end of the document are never read.
+
+    :param data:
+        The annotation XML document as bytes.
+
+    :param tags:
+        A sequence of element names. Default is `slc.ANNOTATION_TAGS`.
+
+    :return:
+        A dict mapping each tag found to its text; an empty string
+        for an empty element.
+    """
+    wanted = set(tags)
+    found = {}
+    for _, elem in iterparse(BytesIO(data), events=('end',)):
+        name = _local_name(elem.tag)
+        if name in wanted:
+            found[name] = (elem.text or '').strip()
+            wanted.discard(name)
+            if not wanted:
+                break
+
+    return found
+
+
+def _time(value):
+    """
+    The time of day of an ISO 8601 timestamp, or an empty string if
+    the timestamp is empty or has no time.
+    """
+    return value.partition('T')[2]
+
+
+def sorted_annotations(names):
+    """
+    Sort the annotation XML filenames of a product by their trailing
+    image number, i.e. by swath then polarisation.
+    """
+    return sorted(names, key=lambda x: x.split("-", 9)[-1])
+
+
+def annotation_details(annotations):
+    """
+    The product attributes derived from the annotation XML of a
+    product. Each annotation document is parsed at most once, and
+    only as far as needed.
+
+    For IW products there are 3 annotations (one per swath) per
+    polarisation, and 1 for SM products. The polarisation is taken
+    from the first annotation of each polarisation, the start time
+    from the first annotation, and the stop time from the last swath
+    of the first polarisation.
+
+    :param annotations:
+        A dict mapping the annotation XML filenames (within the
+        `annotation/` directory of the SAFE) to their content.
+
+    :return:
+        A dict with the keys 'mission', 'mode_beam', 'product_type',
+        'orient', 'polar', 'absolute_orbit', 'datatake_id',
+        'start_time' and 'stop_time'. Values missing or empty in the
+        annotation are empty strings.
+    """
+    names = sorted_annotations(annotations)
+    first = dict.fromkeys(ANNOTATION_TAGS, '')
+    first.update(parse_annotation(annotations[names[0]]))
+
+    # the first letter of the mode; 'S' (stripmap) or 'I' (IW)
+    swaths = 3 if first['mode'][:1] == 'I' else 1
+
+    polar = [first['polarisation']]
+    for name in names[swaths::swaths]:
+        other = parse_annotation(annotations[name], ('polarisation',))
+        polar.append(other.get('polarisation', ''))
+
+    stop = first['stopTime']
+    if swaths > 1:
+        last = parse_annotation(annotations[names[swaths - 1]],
+                                ('stopTime',))
+        stop = last.get('stopTime', '')
+
+    return {
+        'mission': first['missionId'],
+        'mode_beam': first['mode'],
+        'product_type': first['productType'],
+        'orient': first['pass'],
+        'polar': "-".join(p for p in polar if p),
+        'absolute_orbit': first['absoluteOrbitNumber'],
+        'datatake_id': first['missionDataTakeId'],
+        'start_time': _time(first['startTime']),
+        'stop_time': _time(stop)
+    }
+
+
+def read_zip(zip_fname):
+    """
+    Read the annotation XML and the preview KML of a product straight
+    from its zip archive; only the central directory and these few KB
+    of members are read, nothing is extracted to disk.
+
+    :param zip_fname:
+        The full file pathname of the product's zip file.
+
+    :return:
+        A tuple of (dict mapping the annotation XML filenames to their
+        content, KML content).
+    """
+    safe_dir = os.path.splitext(os.path.basename(zip_fname))[0] + '.SAFE'
+    anno_dir = os.path.join(safe_dir, 'annotation')
+    preview_dir = os.path.join(safe_dir, 'preview')
+    annotations = {}
+    kml = None
+
+    with zipfile.ZipFile(zip_fname) as src:
+        for member in src.namelist():
+            dirname, filename = os.path.split(member)
+            if dirname == anno_dir and filename.endswith('.xml'):
+                annotations[filename] = src.read(member)
+            elif dirname == preview_dir and filename == 'map-overlay.kml':
+                kml = src.read(member)
+
+    return annotations, kml
+
+
+def kml_corners(kml):
+    """
+    The corner coordinates of a product's footprint from its preview
+    KML.
+
+    :return:
+        A list of (lon, lat) tuples, ordered UL, UR, LR, LL.
+    """
+    coords = parse_annotation(kml, ('coordinates',))['coordinates']
+
+    return [tuple(float(v) for v in corner.split(',')[:2])
+            for corner in coords.split()[:4]]
+
+
+def fix_lon_coords(lons, orient):
+    """
+    Shift the corner longitudes of a footprint crossing the antimeridian
+    onto the same side, so that the polygons plot properly in ArcGIS.
+
+    :param lons:
+        A tuple of the (UL, UR, LR, LL) corner longitudes.
+
+    :param orient:
+        The pass direction; 'Ascending' or 'Descending'.
+
+    :return:
+        A tuple of the (UL, UR, LR, LL) corner longitudes.
+    """
+    ul, ur, lr, ll = lons
+
+    if orient == 'Ascending':
+        if ul > 0 and ll > 0 and ur < 0 and lr < 0:
+            # left and right split by line
+            ul, ll = ul - 360, ll - 360
+        elif ul > 0 and ur > 0 and lr < 0 and ll < 0:
+            # upper and lower split by line
+            ll, lr = ll + 360, lr + 360
+        elif ul > 0 and ll < 0 and ur < 0 and lr < 0:
+            # UL corner cut, rest on other side of line
+            ul = ul - 360
+        elif ul > 0 and ll > 0 and ur > 0 and lr < 0:
+            # LR corner cut, rest on other side of line
+            lr = lr + 360
+    elif orient == 'Descending':
+        if ur > 0 and lr > 0 and ul < 0 and ll < 0:
+            # left and right split by line
+            ur, lr = ur - 360, lr - 360
+        elif ul < 0 and ur < 0 and lr > 0 and ll > 0:
+            # upper and lower split by line
+            ul, ur = ul + 360, ur + 360
+        elif ul > 0 and ur > 0 and lr < 0 and ll < 0:
+            # upper and lower split by line
+            ll, lr = ll + 360, lr + 360
+        elif ul > 0 and ll < 0 and ur < 0 and lr < 0:
+            # UL corner cut, rest on other side of line
+            ul = ul - 360
+        elif ul > 0 and ll > 0 and ur > 0 and lr < 0:
+            # LR corner cut, rest on other side of line
+            lr = lr + 360
+        elif ul > 0 and ll < 0 and ur > 0 and lr > 0:
+            # LL corner cut, rest on other side of line
+            ll = ll + 360
+
+    return ul, ur, lr, ll
+
+
+def centre_coords(corners, orient):
+    """
+    The centre of a footprint, as the midpoint of the diagonals running
+    across the track; UL to LR, and UR to LL, for ascending passes, or
+    LL to UR, and UL to LR, for descending passes.
+
+    :param corners:
+        A list of (lon, lat) tuples, ordered UL, UR, LR, LL.
+
+    :param orient:
+        The pass direction; 'Ascending' or 'Descending'.
+
+    :return:
+        A tuple of (lon, lat) strings, formatted to 6 decimal places.
+    """
+    ul, ur, lr, ll = corners
+    if orient == 'Ascending':
+        lon_from, lon_to, lat_from, lat_to = ul, lr, ll, ur
+    else:
+        lon_from, lon_to, lat_from, lat_to = ll, ur, ul, lr
+
+    def midpoint(a, b):
+        return Decimal(b) + (Decimal(a) - Decimal(b)) / 2
+
+    return ('%.6f' % midpoint(lon_from[0], lon_to[0]),
+            '%.6f' % midpoint(lat_from[1], lat_to[1]))
+
+
+def name_details(zip_file):
+    """
+    The product attributes encoded in the product's zip filename.
+
+    :return:
+        A dict with the keys 'date', 'unique_product_id',
+        'resolution_class', 'processing_level' and 'product_class'.
+    """
+    parts = os.path.splitext(zip_file)[0].split('_')
+
+    return {
+        'date': parts[6].split('T')[0],
+        'unique_product_id': parts[9],
+        'resolution_class': RESOLUTION_CLASS[parts[3]],
+        'processing_level': parts[4][0].strip(),
+        'product_class': PRODUCT_CLASS[parts[4][1].strip()]
+    }
+
+
+def relative_orbit(absolute_orbit):
+    """
+    The relative orbit from the absolute orbit number;
+    mod(absolute_orbit - 73, 175) + 1. None if `absolute_orbit` is None.
+    """
+    if absolute_orbit is None:
+        return None
+
+    return (int(absolute_orbit) - 73) % 175 + 1
+
+
+def product_record(zip_fname, grid_dir):
+    """
+    The footprint and attributes of a single SLC product.
+
+    :param zip_fname:
+        The full file pathname of the product's zip file.
+
+    :param grid_dir:
+        The name of the grid directory containing the product.
+
+    :return:
+        A tuple of (`Record`, polygon parts); the parts being a list
+        of rings, each a list of [lon, lat] pairs ordered UL, UR, LR, LL.
+    """
+    zip_file = os.path.basename(zip_fname)
+    annotations, kml = read_zip(zip_fname)
+    details = annotation_details(annotations)
+    names = name_details(zip_file)
+    orient = details['orient']
+
+    corners = kml_corners(kml)
+    lons = fix_lon_coords([lon for lon, _ in corners], orient)
+    corners = [(lon, lat) for lon, (_, lat) in zip(lons, corners)]
+    cen_lon, cen_lat = centre_coords(corners, orient)
+    (ul_lon, ul_lat), (ur_lon, ur_lat), (lr_lon, lr_lat), (ll_lon, ll_lat) = (
+        corners)
+
+    # frame is a temporary number, until one can be assigned to a stack
+    # of scenes that cover the same area
+    record = Record(details['mission'], details['mode_beam'],
+                    details['product_type'], names['date'], orient,
+                    details['polar'], details['absolute_orbit'],
+                    relative_orbit(details['absolute_orbit'] or None), "001",
+                    names['unique_product_id'], details['datatake_id'],
+                    names['resolution_class'], names['processing_level'],
+                    names['product_class'], details['start_time'],
+                    details['stop_time'], cen_lon, cen_lat, ul_lon, ul_lat,
+                    ur_lon, ur_lat, lr_lon, lr_lat, ll_lon, ll_lat,
+                    grid_dir, zip_file)
+    parts = [[list(corner) for corner in corners]]
+
+    return record, parts
+
+
+def read_zip_list(zip_list):
+    """
+    Read a zip list, as created by `create_S1_zipfile_list.bash`; each
+    line containing a leading field, the grid directory and the zip
+    filename, separated by spaces.
+
+    :return:
+        A list of (grid directory, zip filename) tuples.
+    """
+    products = []
+    with open(zip_list) as src:
+        for line in src:
+            fields = line.split(' ')
+            if len(fields) < 3:
+                continue
+            products.append((fields[1].strip(), fields[2].strip()))
+
+    return products
+
+
+def output_name(zip_list):
+    """
+    The year, year-month and output basename for a zip list, as
+    derived from the list's filename, eg `..._IW_..._2018-01_...`.
+
+    :return:
+        A tuple of (year, year-month, basename).
+    """
+    parts = os.path.basename(zip_list).split('_')
+    mode = "SM" if parts[1][0] == "S" else "IW"
+    yr_mth = parts[3]
+    yr = yr_mth.split('-')[0]
+
+    return yr, yr_mth, "{}_{}_S1_SLC".format(yr_mth, mode)
+
+
+def _product_task(job):
+    """
+    Extract a single product within a worker process. All state is
+    local to the job, so any number may run concurrently.
+    """
+    zip_fname, grid_dir = job
+    try:
+        return product_record(zip_fname, grid_dir)
+    except Exception as err:
+        # name the offending product, as the traceback of the worker
+        # process is otherwise lost
+        raise RuntimeError("{}: {!r}".format(zip_fname, err))
+
+
+def extract_products(jobs, workers=1, chunksize=4):
+    """
+    Extract the footprint and attributes of each product, spread across
+    a pool of worker processes.
+
+    :param jobs:
+        A list of (zip file pathname, grid directory) tuples.
+
+    :param workers:
+        The number of worker processes. Use 1 to extract within the
+        current process, or None for the number of CPUs. Default is 1.
+
+    :param chunksize:
+        The number of jobs sent to a worker at a time. Default is 4.
+
+    :return:
+        A generator of (`Record`, polygon parts) tuples, yielded in the
+        same order as `jobs` regardless of the order they complete in.
+    """
+    if workers == 1:
+        for job in jobs:
+            yield _product_task(job)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for product in executor.map(_product_task, jobs,
+                                    chunksize=chunksize):
+            yield product
+
+
+def footprint_format(fname):
+    """
+    The format of a footprint layer, determined from its file extension.
+
+    :return:
+        A key of `slc.FOOTPRINT_FORMATS`.
+    """
+    suffix = os.path.splitext(str(fname))[1].lower()
+    for fmt, extension in FOOTPRINT_FORMATS.items():
+        if suffix == extension:
+            return fmt
+
+    msg = "Unrecognised footprint layer format: {}"
+    raise ValueError(msg.format(fname))
+
+
+def _typed(record, truncate=False):
+    """
+    The values of a `Record` cast to the type of their field; numeric
+    fields without decimals as int, those with as float. Character
+    fields are optionally truncated to the field size, as required by
+    the dbf of a shapefile.
+    """
+    values = []
+    for value, (_, field_type, size, decimals) in zip(record, SCHEMA):
+        if field_type == 'C':
+            values.append(str(value)[:size] if truncate else str(value))
+        elif decimals:
+            values.append(float(value))
+        else:
+            values.append(int(value))
+
+    return values
+
+
+class FootprintWriter:
+    """
+    Write product footprints to a single Shapefile, GeoPackage or
+    GeoParquet layer with the `slc.SCHEMA` fields. Footprints are
+    accumulated and flushed in batches; a batch of features via fiona,
+    or a row group of the GeoParquet file. Each output is written in
+    a single pass rather than reopened per product.
+
+    :param out_fname:
+        The output file pathname.
+
+    :param fmt:
+        A key of `slc.FOOTPRINT_FORMATS`. Default is None, i.e.
+        determined from the extension of `out_fname`.
+
+    :param batch_size:
+        The number of footprints accumulated before each flush.
+        Default is 1000.
+    """
+
+    def __init__(self, out_fname, fmt=None, batch_size=1000):
+        self.out_fname = str(out_fname)
+        self.fmt = footprint_format(out_fname) if fmt is None else fmt
+        self.batch_size = batch_size
+        self.count = 0
+        self._pending = []
+
+        if self.fmt == 'GeoParquet':
+            self._dst = self._open_parquet()
+        elif self.fmt in FOOTPRINT_FORMATS:
+            self._dst = self._open_fiona()
+        else:
+            msg = "Unsupported footprint layer format: {}"
+            raise ValueError(msg.format(self.fmt))
+
+    def _open_fiona(self):
+        import fiona
+
+        types = {'C': 'str', 'N': 'int'}
+        properties = []
+        for name, field_type, size, decimals in SCHEMA:
+            if field_type == 'C' and self.fmt == 'GeoPackage':
+                # no width limit, so the times aren't truncated
+                properties.append((name, 'str'))
+            elif decimals:
+                properties.append((name, 'float:{}.{}'.format(size,
+                                                              decimals)))
+            else:
+                properties.append((name, '{}:{}'.format(types[field_type],
+                                                        size)))
+
+        schema = {'geometry': 'Polygon', 'properties': dict(properties)}
+        driver = {'Shapefile': 'ESRI Shapefile',
+                  'GeoPackage': 'GPKG'}[self.fmt]
+
+        return fiona.open(self.out_fname, 'w', driver=driver,
+                          crs='EPSG:4326', schema=schema)
+
+    def _open_parquet(self):
+        import pyarrow
+        from pyarrow import parquet
+        from cophub.layers import geo_metadata
+
+        types = {'C': pyarrow.string(), 'N': pyarrow.int64()}
+        fields = [(name, pyarrow.float64() if decimals else types[field_type])
+                  for name, field_type, _, decimals in SCHEMA]
+        fields.append(('geometry', pyarrow.binary()))
+
+        # no crs recorded; GeoParquet defaults to lon/lat on WGS84
+        schema = pyarrow.schema(fields,
+                                geo_metadata('geometry', ['Polygon']))
+
+        return parquet.ParquetWriter(self.out_fname, schema)
+
+    def write(self, record, parts):
+        """
+        Add a single footprint, flushing once a batch accumulates.
+
+        :param record:
+            A `Record` of the product's attributes.
+
+        :param parts:
+            The polygon parts, as returned by `slc.product_record`.
+        """
+        self._pending.append((record, parts))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write any accumulated footprints.
+        """
+        if not self._pending:
+            return
+
+        if self.fmt == 'GeoParquet':
+            self._flush_parquet()
+        else:
+            truncate = self.fmt == 'Shapefile'
+            self._dst.writerecords([
+                {'geometry': {'type': 'Polygon', 'coordinates': parts},
+                 'properties': dict(zip(FIELDS, _typed(record, truncate)))}
+                for record, parts in self._pending])
+
+        self.count += len(self._pending)
+        self._pending = []
+
+    def _flush_parquet(self):
+        import pyarrow
+        from shapely.geometry import Polygon
+
+        columns = list(zip(*[_typed(record) for record, _ in self._pending]))
+        data = dict(zip(FIELDS, [list(column) for column in columns]))
+        data['geometry'] = [Polygon(parts[0], parts[1:]).wkb
+                            for _, parts in self._pending]
+
+        table = pyarrow.table(data, schema=self._dst.schema)
+        self._dst.write_table(table)
+
+    def close(self):
+        """
+        Flush any remaining footprints and close the output. Shapefiles
+        receive the same WGS84 projection file as the archived
+        footprint shapefiles.
+        """
+        if self._dst is None:
+            return
+
+        self.flush()
+        self._dst.close()
+        self._dst = None
+
+        if self.fmt == 'Shapefile':
+            prj_fname = os.path.splitext(self.out_fname)[0] + '.prj'
+            with open(prj_fname, 'w') as prj:
+                prj.write(WGS84_WKT)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def write_footprints(products, out_fname, fmt=None, batch_size=1000,
+                     progress=None):
+    """
+    Write the product footprints to a single output layer. This is the
+    single writer; products are accumulated as they arrive, and
+    flushed in batches.
+
+    :param products:
+        An iterable of (`Record`, polygon parts) tuples, such as
+        returned by `slc.extract_products`.
+
+    :param out_fname:
+        The output file pathname.
+
+    :param fmt:
+        See `slc.FootprintWriter`.
+
+    :param batch_size:
+        See `slc.FootprintWriter`.
+
+    :param progress:
+        Optional. A callable, called with each `Record` as it is
+        written, i.e. to report progress.
+
+    :return:
+        The number of products written.
+    """
+    with FootprintWriter(out_fname, fmt, batch_size) as writer:
+        for record, parts in products:
+            if progress is not None:
+                progress(record)
+            writer.write(record, parts)
+
+    return writer.count
+
+
+def slc_footprints(zip_list, outdir, sar_dir=SAR_DIR, workers=1,
+                   fmt='Shapefile', batch_size=1000, progress=None):
+    """
+    Create the S1 SLC footprint layer for a zip list; the products
+    are extracted in parallel and written by the calling process, in
+    the order of the zip list.
+
+    :param zip_list:
+        A zip list for a single month and mode, as created by
+        `create_S1_zipfile_list.bash`.
+
+    :param outdir:
+        The directory to contain the output layer.
+
+    :param sar_dir:
+        The base directory of the SLC archive, organised as
+        `year/year-month/grid/zip`. Default is `slc.SAR_DIR`.
+
+    :param workers:
+        See `slc.extract_products`.
+
+    :param fmt:
+        A key of `slc.FOOTPRINT_FORMATS`. Default is 'Shapefile'.
+
+    :param batch_size:
+        See `slc.FootprintWriter`.
+
+    :param progress:
+        See `slc.write_footprints`.
+
+    :return:
+        A tuple of (output file pathname, number of products).
+    """
+    yr, yr_mth, basename = output_name(zip_list)
+    jobs = [(os.path.join(sar_dir, yr, yr_mth, grid_dir, zip_file), grid_dir)
+            for grid_dir, zip_file in read_zip_list(zip_list)]
+
+    if not os.path.exists(outdir):
+        os.makedirs(outdir)
+
+    out_fname = os.path.join(outdir, basename + FOOTPRINT_FORMATS[fmt])
+    count = write_footprints(extract_products(jobs, workers), out_fname, fmt,
+                             batch_size, progress)
+
+    return out_fname, count
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+"""
+Micro-benchmark of the Sentinel-1 SLC annotation parsing; a full
+`minidom` DOM build per attribute, as previously done by
+`create_S1_SLC_shapefile.py`, against the single streaming parse of
+`cophub.slc.parse_annotation`.
+
+The sample annotation files are given either as XML files, or as
+SLC zips from which every `annotation/*.xml` member is read.
+"""
+
+from pathlib import Path
+from xml.dom.minidom import parseString
+import zipfile
+import click
+
+from cophub.slc import ANNOTATION_TAGS, parse_annotation
+
+from benchmark_count import timeit
+
+
+def load_samples(paths):
+    """
+    Read the annotation XML documents from a list of XML files or
+    SLC zips.
+
+    :return:
+        A list of (name, bytes) tuples.
+    """
+    samples = []
+    for path in paths:
+        path = Path(path)
+        if path.suffix.lower() != '.zip':
+            samples.append((path.name, path.read_bytes()))
+            continue
+
+        with zipfile.ZipFile(str(path)) as src:
+            for member in src.namelist():
+                parent = Path(member).parent
+                if parent.name == 'annotation' and member.endswith('.xml'):
+                    samples.append((Path(member).name, src.read(member)))
+
+    return samples
+
+
+def legacy_parse(data):
+    """
+    One DOM build per attribute, taking the last occurrence of each tag.
+    """
+    found = {}
+    for tag in ANNOTATION_TAGS:
+        dom = parseString(data)
+        for elem in dom.getElementsByTagName(tag):
+            found[tag] = elem.firstChild.data.strip()
+
+    return found
+
+
+def _parse_all(func, samples):
+    return [func(data) for _, data in samples]
+
+
+@click.command()
+@click.option("--repeats", default=3, show_default=True,
+              help="Number of repeats; the best time is reported.")
+@click.argument("paths", nargs=-1, required=True,
+                type=click.Path(exists=True, dir_okay=False, file_okay=True))
+def main(repeats, paths):
+    """
+    Main level.
+    """
+    samples = load_samples(paths)
+    if not samples:
+        raise click.UsageError("No annotation XML found.")
+
+    legacy = timeit(_parse_all, legacy_parse, samples, repeats=repeats)
+    stream = timeit(_parse_all, parse_annotation, samples, repeats=repeats)
+
+    # the streaming parse takes the first (adsHeader) occurrence of
+    # each tag, so report any documents where that differs
+    differ = [name for name, data in samples
+              if legacy_parse(data) != parse_annotation(data)]
+
+    size = sum(len(data) for _, data in samples)
+    print("Annotation parsing ({} documents, {:.1f} MB)".format(
+        len(samples), size / 1e6))
+    print("\tminidom per attribute:  {:.3f}s".format(legacy))
+    print("\tsingle streaming parse: {:.3f}s".format(stream))
+    print("\tspeedup:                {:.1f}x".format(legacy / stream))
+    print("\tdocuments differing:    {}".format(len(differ)))
+    for name in differ:
+        print("\t\t{}".format(name))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+"""
+Benchmarks for the stages of `cophub.count_overlaps.count`, using
+synthetic SARA-like acquisition footprints scattered over the
+Australasia region.
+"""
+
+from pathlib import Path
+import json
+import tempfile
+import time
+import click
+import numpy
+from shapely.geometry import Polygon, mapping
+
+from cophub.count_overlaps import footprints, count, count_raster
+
+
+def synthetic_features(n, seed=0):
+    """
+    Create `n` GeoJSON features resembling SARA acquisition footprints;
+    slightly rotated quadrilaterals of roughly 2 x 2 degrees.
+    """
+    rng = numpy.random.RandomState(seed)
+    lon = rng.uniform(100, 175, n)
+    lat = rng.uniform(-50, 0, n)
+    skew = rng.uniform(-0.3, 0.3, n)
+
+    features = []
+    for i in range(n):
+        x, y, s = lon[i], lat[i], skew[i]
+        poly = Polygon([(x, y), (x + 2, y + s), (x + 2 + s, y + 2),
+                        (x + s, y + 2 - s), (x, y)])
+        features.append({
+            "type": "Feature",
+            "geometry": mapping(poly),
+            "properties": {"title": "synthetic_{}".format(i)}
+        })
+
+    return features
+
+
+def legacy_read(query_result):
+    """
+    The original GeoJSON round trip via a temporary file.
+    """
+    import geopandas
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = str(Path(tmpdir, 'query.geojson'))
+        with open(fname, 'w') as src:
+            json.dump(query_result, src, indent=4)
+
+        return geopandas.read_file(fname)
+
+
+def timeit(func, *args, repeats=3):
+    """
+    Return the best wall time in seconds from `repeats` calls.
+    """
+    best = None
+    for _ in range(repeats):
+        st = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - st
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+@click.command()
+@click.option("--n-features", default=5000, show_default=True,
+              help="Number of synthetic footprints.")
+@click.option("--repeats", default=3, show_default=True,
+              help="Number of repeats; the best time is reported.")
+@click.option("--resolution", default=0.01, show_default=True,
+              help="Pixel size in degrees for the raster counting mode.")
+def main(n_features, repeats, resolution):
+    """
+    Main level.
+    """
+    features = synthetic_features(n_features)
+    query_result = {
+        "type": "FeatureCollection",
+        "properties": {},
+        "features": features
+    }
+
+    legacy = timeit(legacy_read, query_result, repeats=repeats)
+    direct = timeit(footprints, features, repeats=repeats)
+
+    print("GeoDataFrame construction ({} footprints)".format(n_features))
+    print("\ttemp-file GeoJSON round trip: {:.3f}s".format(legacy))
+    print("\tin-memory from features:      {:.3f}s".format(direct))
+    print("\tspeedup:                      {:.1f}x".format(legacy / direct))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        out_fname = str(Path(tmpdir, 'count.tif'))
+        vector = timeit(count, query_result, repeats=repeats)
+        raster = timeit(count_raster, query_result, out_fname, resolution,
+                        repeats=repeats)
+
+    print("Overlap counting ({} footprints)".format(n_features))
+    print("\tvector (union + polygonise):  {:.3f}s".format(vector))
+    print("\traster ({} degrees):        {:.3f}s".format(resolution, raster))
+    print("\tspeedup:                      {:.1f}x".format(vector / raster))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+"""
+Benchmark the polygon and raster render modes of `cophub.maps.render`,
+using a count layer of synthetic SARA-like acquisition footprints.
+The PNG's of both modes are compared to confirm they are visually
+equivalent.
+"""
+
+from pathlib import Path
+import tempfile
+import click
+import matplotlib
+matplotlib.use('Agg')
+import numpy
+import matplotlib.pyplot as plt
+
+from cophub.count_overlaps import count
+from cophub.layers import write_layer, layer_metadata
+from cophub.maps import map_crs, map_window, render
+
+from benchmark_count import synthetic_features, timeit
+
+
+@click.command()
+@click.option("--n-features", default=5000, show_default=True,
+              help="Number of synthetic footprints.")
+@click.option("--repeats", default=3, show_default=True,
+              help="Number of repeats; the best time is reported.")
+def main(n_features, repeats):
+    """
+    Main level.
+    """
+    query_result = {
+        "type": "FeatureCollection",
+        "properties": {},
+        "features": synthetic_features(n_features)
+    }
+    layer = count(query_result)
+
+    query_params = ['startDate=2018-01-01', 'completionDate=2018-02-01',
+                    'productType=S2MSI1C']
+    crs_proj4 = map_crs()
+    window = map_window(crs_proj4)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = Path(tmpdir, 'layer.parquet')
+        write_layer(layer, fname, metadata=layer_metadata('S2', query_params))
+
+        times = {}
+        images = {}
+        for mode in ('polygon', 'raster'):
+            outdir = Path(tmpdir, mode)
+            outdir.mkdir()
+            times[mode] = timeit(render, fname, outdir, None, crs_proj4,
+                                 None, window, mode, repeats=repeats)
+            images[mode] = plt.imread(str(outdir.joinpath('layer.png')))
+
+    # the fraction of pixels that differ noticeably between the modes
+    diff = numpy.abs(images['polygon'] - images['raster']).max(axis=-1)
+    differ = (diff > 0.1).mean()
+
+    print("Map rendering ({} footprints, {} pieces)".format(n_features,
+                                                            len(layer)))
+    print("\tpolygon patches:  {:.3f}s".format(times['polygon']))
+    print("\traster image:     {:.3f}s".format(times['raster']))
+    print("\tspeedup:          {:.1f}x".format(times['polygon'] /
+                                               times['raster']))
+    print("\tpixels differing: {:.2%}".format(differ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+"""
+Startup time benchmark for the `bin/` entry points.
+
+Each utility is run with `--help` under `python -X importtime`, and the
+wall time, total import time, slowest imports and any heavy geospatial
+or plotting dependencies loaded are reported. The exit status is
+non-zero if any utility exceeds the time threshold, or loads a heavy
+dependency just to print its help, so that import regressions are
+caught.
+"""
+
+from pathlib import Path
+import os
+import subprocess
+import sys
+import time
+import click
+
+BIN_DIR = Path(__file__).absolute().parents[1].joinpath('bin')
+HEAVY = ('geopandas', 'fiona', 'shapely', 'rasterio', 'matplotlib',
+         'cartopy', 'pandas', 'numpy', 'pyarrow')
+
+
+def importtime(script):
+    """
+    Run a utility's `--help` under `-X importtime`.
+
+    :return:
+        A tuple of (wall time in seconds, list of
+        (cumulative microseconds, module name) tuples).
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [str(BIN_DIR.parent), env.get('PYTHONPATH', '')])
+
+    st = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', str(script),
+                           '--help'], env=env, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, universal_newlines=True)
+    elapsed = time.perf_counter() - st
+
+    if proc.returncode != 0:
+        raise RuntimeError("{} failed:\n{}".format(script.name, proc.stderr))
+
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        # nested imports are indented beyond the single leading space
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imports.append((int(cumulative), name.rstrip()[1:]))
+
+    return elapsed, imports
+
+
+@click.command()
+@click.option("--threshold", default=1.0, show_default=True,
+              help="The maximum acceptable startup time in seconds.")
+@click.option("--top", default=5, show_default=True,
+              help="The number of slowest top level imports to report.")
+def main(threshold, top):
+    """
+    Main level.
+    """
+    failed = False
+    for script in sorted(BIN_DIR.iterdir()):
+        elapsed, imports = importtime(script)
+
+        top_level = [(t, n) for t, n in imports if not n.startswith(' ')]
+        total = sum(t for t, _ in top_level) / 1e6
+        heavy = sorted({n.strip().split('.')[0] for _, n in imports
+                        if n.strip().split('.')[0] in HEAVY})
+
+        status = "ok"
+        if elapsed > threshold or heavy:
+            status = "FAIL"
+            failed = True
+
+        print("{} {}: {:.3f}s wall, {:.3f}s imports".format(
+            status, script.name, elapsed, total))
+        for t, name in sorted(top_level, reverse=True)[:top]:
+            print("\t{:>8.3f}s {}".format(t / 1e6, name.strip()))
+        if heavy:
+            print("\theavy imports: {}".format(", ".join(heavy)))
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,7 @@
 #!/usr/bin/env python
 
-import subprocess
-from pathlib import Path
-import pandas
+from cophub.backlog import backlog_jobs, run_backlog, summary
+from cophub.cache import QueryCache
 
 MODES = ["IW", "SM", "EW"]
 PRODUCTS = ["SLC", "GRD"]
@@ -20,28 +19,22 @@ COMBINATIONS = [
     ("SLC", "SM", "Descending")
 ]
 START, END = ["2014-10-01", "2018-11-01"]
-YEAR_MONTHS = pandas.date_range(start=START, end=END, freq='MS')
+OUTDIR = "/home/sixy/data/SARA/MonthlyCoverageMaps"
 
-for i in range(1, len(YEAR_MONTHS)):
-    start_date = YEAR_MONTHS[i-1].strftime('%Y-%m-%d')
-    end_date = YEAR_MONTHS[i].strftime('%Y-%m-%d')
-    outdir = Path("/home/sixy/data/SARA/MonthlyCoverageMaps").joinpath(YEAR_MONTHS[i-1].strftime('%Y-%m'))
-    for combo in COMBINATIONS:
-        cmd = [
-            "cophub_overlaps",
-            "--collection", "S1",
-            "-q", "startDate={}".format(start_date),
-            "-q", "completionDate={}".format(end_date),
-            "-q", "productType={}".format(combo[0]),
-            "-q", "sensorMode={}".format(combo[1]),
-            "-q", "orbitDirection={}".format(combo[2]),
-            "--outdir", outdir
-        ]
 
-        print("executing:")
-        print(cmd)
-        try:
-            subprocess.check_call(cmd)
-        except subprocess.CalledProcessError:
-            print("Failed to execute command:")
-            print(cmd)
+def main():
+    """
+    Main level.
+    """
+    combinations = [["productType={}".format(combo[0]),
+                     "sensorMode={}".format(combo[1]),
+                     "orbitDirection={}".format(combo[2])]
+                    for combo in COMBINATIONS]
+
+    jobs = backlog_jobs("S1", START, END, OUTDIR, combinations)
+    results = run_backlog(jobs, cache=QueryCache())
+    print(summary(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+
+"""
+A local stand-in for the SARA search API.
+Serves the features of a GeoJSON file as SARA shaped, paged JSON, so
+that `cophub.sara.iter_query` and `count_stream` can be run
+offline, e.g.
+
+    iter_query("S1", [...], url="http://localhost:8000")
+
+Only the `maxRecords` and `page` query parameters are honoured; every
+other parameter is ignored and all features are served. As SARA does,
+`maxRecords` can be capped by the server.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from urllib.parse import parse_qs, urlparse
+import json
+import click
+
+
+def make_handler(features, max_records=None):
+    """
+    Create a request handler class serving the given features,
+    with at most `max_records` features per page.
+    """
+
+    class SearchHandler(BaseHTTPRequestHandler):
+
+        # keep connections alive between requests, as SARA does
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if not url.path.endswith('/search.json'):
+                self.send_error(404)
+                return
+
+            query = parse_qs(url.query)
+            page_size = int(query.get('maxRecords', ['500'])[0])
+            if max_records is not None:
+                page_size = min(page_size, max_records)
+            page = int(query.get('page', ['1'])[0])
+            start = (page - 1) * page_size
+
+            doc = {
+                "type": "FeatureCollection",
+                "properties": {
+                    "totalResults": len(features),
+                    "startIndex": start + 1,
+                    "itemsPerPage": page_size
+                },
+                "features": features[start:start + page_size]
+            }
+            body = json.dumps(doc).encode('utf-8')
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return SearchHandler
+
+
+def serve(features, port=0, max_records=None):
+    """
+    Start the stand-in server in a background thread.
+
+    :param features:
+        A list of GeoJSON features to serve.
+
+    :param port:
+        The port to listen on. Default is 0, i.e. any free port.
+
+    :param max_records:
+        Optional. The server's cap on `maxRecords`. Default is None,
+        i.e. uncapped.
+
+    :return:
+        A tuple of (server, url). Call `server.shutdown()` to stop.
+    """
+    server = ThreadingHTTPServer(('localhost', port),
+                                 make_handler(features, max_records))
+    Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://localhost:{}".format(server.server_address[1])
+
+    return server, url
+
+
+@click.command()
+@click.option("--geojson", required=True,
+              type=click.Path(exists=True, dir_okay=False, file_okay=True),
+              help="A GeoJSON FeatureCollection containing the features "
+                   "to serve.")
+@click.option("--port", default=8000, show_default=True,
+              help="The port to listen on.")
+@click.option("--max-records", type=int,
+              help="Cap the features per page at the given number.")
+def main(geojson, port, max_records):
+    """
+    Main level.
+    """
+    with open(geojson) as src:
+        features = json.load(src)['features']
+
+    server = ThreadingHTTPServer(('localhost', port),
+                                 make_handler(features, max_records))
+    print("Serving {} features at http://localhost:{}".format(len(features),
+                                                              port))
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
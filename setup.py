@@ -14,10 +14,15 @@ setup(name='cophub',
           'fiona',
           'geopandas',
           'shapely',
+          'numpy',
+          'rasterio',
+          'pyarrow',
           'auscophub'
       ],
       dependency_links=[
           'hg+https://bitbucket.org/chchrsc/auscophub/get/auscophub-1.1.7.tar.gz#egg=auscophub-1.1.7'
       ],
-      scripts=['bin/cophub_maps', 'bin/cophub_info', 'bin/cophub_overlaps']
+      scripts=['bin/cophub_maps', 'bin/cophub_info', 'bin/cophub_overlaps',
+               'bin/cophub_merge', 'bin/cophub_backlog',
+               'bin/cophub_slc_footprints', 'bin/cophub_catalogue']
       )
@@ -0,0 +1,39 @@
+"""
+Shared test configuration.
+
+`cophub.sara` imports `auscophub.saraclient` at module load. Where
+auscophub isn't installed, a minimal stand-in for the parts of
+saraclient used by cophub is registered, so that the tests run
+regardless; the tests patch or avoid the SARA search itself.
+"""
+
+from urllib.error import HTTPError
+import json
+import sys
+import types
+import urllib.request
+
+try:
+    from auscophub import saraclient  # noqa: F401
+except ImportError:
+    def makeUrlOpener(proxy=None):
+        return urllib.request.build_opener()
+
+    def readJsonUrl(urlOpener, url):
+        try:
+            return json.loads(urlOpener.open(url).read()), None
+        except HTTPError as e:
+            return None, str(e)
+
+    def searchSara(urlOpener, sentinelNumber, paramList):
+        raise RuntimeError("SARA isn't available to the tests")
+
+    saraclient = types.ModuleType('auscophub.saraclient')
+    saraclient.makeUrlOpener = makeUrlOpener
+    saraclient.readJsonUrl = readJsonUrl
+    saraclient.searchSara = searchSara
+
+    auscophub = types.ModuleType('auscophub')
+    auscophub.saraclient = saraclient
+    sys.modules['auscophub'] = auscophub
+    sys.modules['auscophub.saraclient'] = saraclient
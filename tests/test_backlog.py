@@ -0,0 +1,86 @@
+"""
+Tests for the backlog jobs and their manifests, run from a local
+footprint catalogue rather than SARA.
+"""
+
+import os
+
+from cophub.backlog import (Job, backlog_jobs, date_windows, key, record,
+                            run_backlog, run_job)
+from cophub.catalogue import Catalogue, sara_products
+from cophub.manifest import job_manifest
+
+
+def feature(title, lon, start):
+    ring = [[lon, -30], [lon + 2, -30], [lon + 2, -28], [lon, -28],
+            [lon, -30]]
+    return {"type": "Feature",
+            "geometry": {"type": "Polygon", "coordinates": [ring]},
+            "properties": {"title": title, "productType": "GRD",
+                           "startDate": start}}
+
+
+def catalogue(tmp_path):
+    catalogue = Catalogue(tmp_path.joinpath('catalogue.sqlite'))
+    catalogue.add(sara_products([
+        feature('a', 130, '2018-01-05T10:00:00'),
+        feature('b', 131, '2018-01-20T10:00:00'),
+        feature('c', 130, '2018-02-03T10:00:00')], 'S1'))
+
+    return catalogue
+
+
+def test_date_windows():
+    assert date_windows('2018-01-01', '2018-03-01') == [
+        ('2018-01-01', '2018-02-01', '2018-01'),
+        ('2018-02-01', '2018-03-01', '2018-02')]
+
+
+def test_key_defaults(tmp_path):
+    job = Job('S1', ['productType=GRD'], str(tmp_path), None)
+
+    # the options as given explicitly by cophub_overlaps
+    explicit = {'raster_resolution': None, 'premerge_footprints': False,
+                'group_by': [], 'fmt': 'GeoJSON', 'precision': None,
+                'drop_slivers': False, 'tile_size': 2.0, 'workers': 4}
+    assert key(job, **explicit) == key(job)
+    assert key(job, precision=0) != key(job)
+    assert key(job, fmt='GeoParquet') != key(job)
+
+    # the same directory, given differently
+    other = job._replace(outdir=os.path.join(str(tmp_path), '.', ''))
+    assert key(other) == key(job)
+
+
+def test_run_backlog(tmp_path):
+    kwargs = {'catalogue': catalogue(tmp_path)}
+    outdir = tmp_path.joinpath('out')
+    jobs = backlog_jobs('S1', '2018-01-01', '2018-03-01', str(outdir),
+                        [['productType=GRD']])
+
+    results = run_backlog(jobs, workers=2, **kwargs)
+    assert [r.status for r in results] == ['complete', 'complete']
+    assert all(os.path.exists(r.out_fname) for r in results)
+
+    # each job is recorded in the manifest of its own output directory
+    for job in jobs:
+        assert key(job, **kwargs) in job_manifest(job.outdir).load()
+
+    results = run_backlog(jobs, workers=2, **kwargs)
+    assert [r.status for r in results] == ['skipped', 'skipped']
+
+
+def test_shared_manifest(tmp_path):
+    kwargs = {'catalogue': catalogue(tmp_path)}
+    outdir = tmp_path.joinpath('out', '2018-01')
+
+    # a month counted by a single job, as per cophub_overlaps
+    job = Job('S1', ['startDate=2018-01-01', 'completionDate=2018-02-01',
+                     'productType=GRD'], str(outdir), None)
+    job_manifest(outdir).append(record(run_job(job, **kwargs), **kwargs))
+
+    jobs = backlog_jobs('S1', '2018-01-01', '2018-03-01',
+                        str(tmp_path.joinpath('out')), [['productType=GRD']])
+    results = run_backlog(jobs, workers=2, **kwargs)
+
+    assert [r.status for r in results] == ['skipped', 'complete']
@@ -0,0 +1,74 @@
+"""
+Round trip tests for the SARA query result cache.
+"""
+
+import os
+import time
+
+from cophub.cache import DAY, QueryCache
+
+RESULT = {"type": "FeatureCollection", "properties": {},
+          "features": [{"type": "Feature", "geometry": None,
+                        "properties": {"title": "S1A_0001"}}]}
+PARAMS = ["startDate=2018-01-01", "completionDate=2018-02-01"]
+
+
+def test_round_trip(tmp_path):
+    cache = QueryCache(tmp_path)
+    key = cache.key("S1", PARAMS)
+    assert cache.get(key) is None
+
+    cache.put(key, RESULT, PARAMS)
+    assert cache.get(key) == RESULT
+
+
+def test_key():
+    key = QueryCache.key("S1", PARAMS)
+
+    # insensitive to the order of the parameters
+    assert key == QueryCache.key("S1", PARAMS[::-1])
+    assert key != QueryCache.key("S2", PARAMS)
+    assert key != QueryCache.key("S1", PARAMS, "POLYGON ((0 0, 1 0, 1 1))")
+
+
+def test_entry_ttl(tmp_path):
+    cache = QueryCache(tmp_path, ttl=10, stable_ttl=100, stable_after=28)
+
+    assert cache.entry_ttl(PARAMS) == 100
+    assert cache.entry_ttl(["completionDate=2018-02-01T00:00:00Z"]) == 100
+    today = time.strftime('%Y-%m-%d', time.gmtime())
+    assert cache.entry_ttl(["completionDate={}".format(today)]) == 10
+    assert cache.entry_ttl(["completionDate=unknown"]) == 10
+    assert cache.entry_ttl(["productType=GRD"]) == 10
+
+
+def test_expired(tmp_path):
+    cache = QueryCache(tmp_path, ttl=-DAY, stable_ttl=-DAY)
+    key = cache.key("S1", PARAMS)
+    cache.put(key, RESULT, PARAMS)
+
+    assert cache.get(key) is None
+
+
+def test_evict(tmp_path):
+    cache = QueryCache(tmp_path, max_bytes=0)
+    keys = [cache.key("S1", PARAMS + ["page={}".format(i)]) for i in range(3)]
+    for key in keys:
+        cache.put(key, RESULT, PARAMS)
+
+    # nothing fits within a cache of 0 bytes
+    assert list(tmp_path.glob('*.json.gz')) == []
+
+    cache.max_bytes = 10**6
+    for i, key in enumerate(keys):
+        cache.put(key, RESULT, PARAMS)
+        os.utime(str(cache._fname(key)), (i, i))
+
+    # room for the two most recently used entries
+    cache.max_bytes = sum(cache._fname(k).stat().st_size for k in keys[1:])
+    cache.evict()
+
+    # the least recently used entry is evicted first
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[1]) == RESULT
+    assert cache.get(keys[2]) == RESULT
@@ -0,0 +1,101 @@
+"""
+Tests for the local footprint catalogue.
+"""
+
+import pytest
+
+from cophub.catalogue import Catalogue, bounds, sara_products, slc_product
+from cophub.slc import Record
+
+
+def feature(title, lon, start, product_type='GRD', mode='IW',
+            direction='Ascending', orbit=9):
+    ring = [[lon, -30], [lon + 2, -30], [lon + 2, -28], [lon, -28],
+            [lon, -30]]
+    return {"type": "Feature",
+            "geometry": {"type": "Polygon", "coordinates": [ring]},
+            "properties": {"title": title, "productType": product_type,
+                           "sensorMode": mode, "orbitDirection": direction,
+                           "relativeOrbitNumber": orbit,
+                           "startDate": start}}
+
+
+FEATURES = [
+    feature('a', 130, '2018-01-05T10:00:00'),
+    feature('b', 140, '2018-01-20T10:00:00', direction='Descending'),
+    feature('c', 150, '2018-02-03T10:00:00', product_type='SLC', orbit=12),
+    {"type": "Feature", "geometry": None, "properties": {"title": 'd'}},
+]
+
+
+@pytest.fixture
+def catalogue(tmp_path):
+    catalogue = Catalogue(tmp_path.joinpath('sub', 'catalogue.sqlite'))
+    assert catalogue.add(sara_products(FEATURES, 'S1')) == 3
+
+    return catalogue
+
+
+def names(features):
+    return [f['id'] for f in features]
+
+
+def test_add_known(catalogue):
+    assert catalogue.known(['a', 'c', 'x']) == {'a', 'c'}
+
+    # products are only added once
+    assert catalogue.add(sara_products(FEATURES, 'S1')) == 0
+    assert catalogue.summary() == [('S1', 'GRD', 'IW', 2),
+                                   ('S1', 'SLC', 'IW', 1)]
+
+
+def test_search(catalogue):
+    assert names(catalogue.search()) == ['a', 'b', 'c']
+    assert names(catalogue.search(start='2018-01-10',
+                                  end='2018-02-01')) == ['b']
+    assert names(catalogue.search(product_type='GRD',
+                                  orbit_direction='Ascending')) == ['a']
+    assert names(catalogue.search(relative_orbit=12)) == ['c']
+    assert names(catalogue.search(bbox=(131, -29, 141, -20))) == ['a', 'b']
+    assert catalogue.search(collection='S2') == []
+
+
+def test_query(catalogue):
+    result = catalogue.query('S1', ['startDate=2018-01-01',
+                                    'completionDate=2018-02-01',
+                                    'orbitDirection=Descending'])
+
+    assert result['type'] == 'FeatureCollection'
+    assert names(result['features']) == ['b']
+    assert result['features'][0]['properties'] == FEATURES[1]['properties']
+
+    result = catalogue.query('S1', ['box=149,-35,155,-29',
+                                    'relativeOrbitNumber=12'])
+    assert names(result['features']) == ['c']
+
+    with pytest.raises(ValueError):
+        catalogue.query('S1', ['cloudCover=10'])
+
+
+def test_merged_sources(tmp_path):
+    catalogue = Catalogue(tmp_path.joinpath('catalogue.sqlite'))
+    values = dict.fromkeys(Record._fields, '')
+    values.update(ModeBeam='S3', ProductTyp='SLC', Date='20180105',
+                  Pass='Ascending', RelOrbit=9, StartTime='10:10:01.000000',
+                  ZipFile='a.zip')
+    parts = [[[130, -30], [132, -30], [132, -28], [130, -28]]]
+    slc = slc_product(Record(**values), parts)
+
+    assert slc.mode == 'SM'
+    assert slc.start_time == '2018-01-05T10:10:01.000000'
+    assert bounds(slc.geometry) == (130, -30, 132, -28)
+
+    assert catalogue.add([slc]) == 1
+    assert catalogue.add(sara_products(FEATURES[:1], 'S1')) == 0
+
+    # the SLC footprint, with the SARA properties merged in
+    found = catalogue.search()
+    assert len(found) == 1
+    assert found[0]['geometry']['coordinates'][0][-1] == [130, -30]
+    assert found[0]['properties']['ZipFile'] == 'a.zip'
+    assert found[0]['properties']['sensorMode'] == 'IW'
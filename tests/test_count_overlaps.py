@@ -0,0 +1,113 @@
+"""
+Check the counting engines against a brute force point in polygon
+count of the footprints.
+"""
+
+import numpy
+import pytest
+from shapely.geometry import Point, Polygon, mapping
+
+from cophub.count_overlaps import (count, count_stream, count_tiled,
+                                   premerge, footprints)
+
+
+def synthetic_features(n, seed=0, duplicates=0):
+    """
+    `n` overlapping, slightly rotated quadrilaterals of 2 x 2 degrees
+    within a 6 x 6 degree region, followed by `duplicates` repeats of
+    the first few, each carrying a `tile` property.
+    """
+    rng = numpy.random.RandomState(seed)
+    lon = rng.uniform(130, 134, n)
+    lat = rng.uniform(-30, -26, n)
+    skew = rng.uniform(-0.3, 0.3, n)
+
+    features = []
+    for i in range(n):
+        x, y, s = lon[i], lat[i], skew[i]
+        poly = Polygon([(x, y), (x + 2, y + s), (x + 2 + s, y + 2),
+                        (x + s, y + 2 - s), (x, y)])
+        features.append({
+            "type": "Feature",
+            "geometry": mapping(poly),
+            "properties": {"tile": "T{}".format(i % 3)}
+        })
+
+    return features + [dict(f) for f in features[:duplicates]]
+
+
+def sample_points(n=500, seed=1):
+    rng = numpy.random.RandomState(seed)
+    return [Point(x, y) for x, y in zip(rng.uniform(129.5, 136.5, n),
+                                        rng.uniform(-30.5, -23.5, n))]
+
+
+def brute_force(features, point):
+    return sum(Polygon(f['geometry']['coordinates'][0]).contains(point)
+               for f in features)
+
+
+def layer_count(layer, point):
+    return int(layer[layer.contains(point)]['observations'].sum())
+
+
+def check(layer, features):
+    for point in sample_points():
+        assert layer_count(layer, point) == brute_force(features, point)
+
+
+@pytest.fixture(scope='module')
+def features():
+    return synthetic_features(40, duplicates=10)
+
+
+@pytest.fixture(scope='module')
+def query_result(features):
+    return {"type": "FeatureCollection", "features": features}
+
+
+def test_count(query_result, features):
+    layer = count(query_result)
+
+    assert list(layer.columns) == ['fid', 'geometry', 'observations']
+    assert (layer['observations'] > 0).all()
+    # the pieces form a planar partition
+    area = sum(g.area for g in layer.geometry)
+    assert area == pytest.approx(layer.unary_union.area)
+    check(layer, features)
+
+
+def test_count_premerge(query_result, features):
+    layer = count(query_result, premerge_footprints=True)
+    check(layer, features)
+
+
+def test_count_group_by(query_result, features):
+    layer = count(query_result, group_by=['tile'])
+    check(layer, features)
+
+
+def test_count_tiled(query_result, features):
+    # the tiles cut through the footprints, so the seams are dissolved
+    layer = count_tiled(query_result, tile_size=2.0, workers=2)
+    check(layer, features)
+
+
+def test_count_stream(features):
+    pages = [features[i:i + 7] for i in range(0, len(features), 7)]
+    layer = count_stream(pages)
+    check(layer, features)
+
+
+def test_count_empty():
+    empty = {"type": "FeatureCollection", "features": []}
+    assert count_tiled(empty).empty
+
+
+def test_premerge(features):
+    df = footprints(features, ['tile'])
+    merged = premerge(df)
+
+    assert len(merged) == 40
+    assert merged['multiplicity'].sum() == len(features)
+    assert (merged['multiplicity'].values[:10] == 2).all()
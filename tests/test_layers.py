@@ -0,0 +1,79 @@
+"""
+Round trip tests for the count layer formats.
+"""
+
+import geopandas
+import pytest
+from shapely.geometry import box
+
+from cophub.layers import (FORMATS, LAYER_CRS, fname_metadata, layer_format,
+                           layer_metadata, layer_size, merged_metadata,
+                           read_layer, write_layer)
+from cophub.count_overlaps import output_fname
+
+PARAMS = ["startDate=2018-01-01", "completionDate=2018-02-01",
+          "productType=OL_1_EFR___"]
+
+
+@pytest.fixture
+def layer():
+    geoms = [box(130, -30, 131, -29), box(131, -30, 133, -28)]
+    return geopandas.GeoDataFrame({'fid': [0, 1], 'observations': [3, 1]},
+                                  geometry=geoms, crs=LAYER_CRS)
+
+
+@pytest.mark.parametrize('fmt', list(FORMATS))
+def test_round_trip(tmp_path, layer, fmt):
+    metadata = layer_metadata("S3", PARAMS)
+    fname = output_fname(tmp_path, "S3", PARAMS, FORMATS[fmt])
+    write_layer(layer, fname, fmt, metadata)
+
+    gdf, read_metadata = read_layer(fname)
+
+    assert read_metadata == metadata
+    assert gdf.crs == LAYER_CRS
+    assert list(gdf['observations']) == [3, 1]
+    assert all(a.equals(b) for a, b in zip(gdf.geometry, layer.geometry))
+    assert layer_size(layer, fmt, metadata) == fname.stat().st_size
+
+
+@pytest.mark.parametrize('fmt', ['GeoParquet', 'Feather'])
+def test_embedded_metadata(tmp_path, layer, fmt):
+    # columnar formats don't rely on the filename
+    fname = tmp_path.joinpath('merged' + FORMATS[fmt])
+    write_layer(layer, fname, metadata={'collection': 'S3'})
+
+    assert read_layer(fname)[1] == {'collection': 'S3'}
+
+
+def test_reprojected(tmp_path, layer):
+    fname = tmp_path.joinpath('layer.parquet')
+    write_layer(layer.to_crs('EPSG:3577'), fname)
+    gdf = read_layer(fname)[0]
+
+    assert gdf.crs == LAYER_CRS
+    assert gdf.total_bounds == pytest.approx(layer.total_bounds)
+
+
+def test_layer_format():
+    assert layer_format('x.GeoJSON') == 'GeoJSON'
+    assert layer_format('x.parquet') == 'GeoParquet'
+    with pytest.raises(ValueError):
+        layer_format('x.shp')
+
+
+def test_fname_metadata(tmp_path):
+    fname = output_fname(tmp_path, "S3", PARAMS)
+
+    assert fname_metadata(fname) == layer_metadata("S3", PARAMS)
+    assert fname_metadata('merged.geojson') == {}
+
+
+def test_merged_metadata():
+    january = layer_metadata("S3", PARAMS)
+    february = layer_metadata("S3", ["startDate=2018-02-01",
+                                     "completionDate=2018-03-01"])
+
+    assert merged_metadata([january, february]) == {
+        'collection': 'S3', 'startDate': '2018-01-01',
+        'completionDate': '2018-03-01'}
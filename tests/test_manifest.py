@@ -0,0 +1,70 @@
+"""
+Round trip tests for the job manifest.
+"""
+
+from cophub.manifest import (Manifest, file_hash, is_current, job_key,
+                             result_hash)
+
+RESULT = {"type": "FeatureCollection",
+          "features": [{"type": "Feature", "geometry": None,
+                        "properties": {"title": "S1A_0001"}}]}
+
+
+def record(key, status='complete', out_fname=None, query_hash='abc'):
+    return {'key': key, 'status': status, 'out_fname': out_fname,
+            'query_hash': query_hash, 'content_hash': None}
+
+
+def test_round_trip(tmp_path):
+    manifest = Manifest(tmp_path.joinpath('sub', 'manifest.jsonl'))
+    assert manifest.load() == {}
+
+    manifest.append(record('a', 'failed'))
+    manifest.append(record('b'))
+    manifest.append(record('a'))
+
+    records = manifest.load()
+
+    # the last record of a job supersedes the earlier ones
+    assert sorted(records) == ['a', 'b']
+    assert records['a']['status'] == 'complete'
+    assert 'timestamp' in records['a']
+
+
+def test_partial_record(tmp_path):
+    manifest = Manifest(tmp_path.joinpath('manifest.jsonl'))
+    manifest.append(record('a'))
+    with manifest.fname.open('a') as dst:
+        dst.write('{"key": "b", "sta')
+
+    assert list(manifest.load()) == ['a']
+
+
+def test_is_current(tmp_path):
+    out_fname = tmp_path.joinpath('out.geojson')
+    out_fname.write_text('{}')
+
+    assert is_current(record('a', out_fname=str(out_fname)), 'abc')
+    assert is_current(record('a', 'skipped', str(out_fname)), 'abc')
+    assert not is_current(None, 'abc')
+    assert not is_current(record('a', 'failed', str(out_fname)), 'abc')
+    assert not is_current(record('a', out_fname=str(out_fname)), 'xyz')
+    assert not is_current(record('a', out_fname=None), 'abc')
+
+    out_fname.unlink()
+    assert not is_current(record('a', out_fname=str(out_fname)), 'abc')
+
+
+def test_hashes(tmp_path):
+    params = ["startDate=2018-01-01", "completionDate=2018-02-01"]
+    key = job_key("S1", params, "out")
+
+    assert key == job_key("S1", list(params), "out")
+    assert key != job_key("S1", params, "out", options={'fmt': 'GeoJSON'})
+    assert key != job_key("S1", params[::-1], "out")
+
+    assert result_hash(RESULT) == result_hash(dict(RESULT, properties={}))
+
+    fname = tmp_path.joinpath('x')
+    fname.write_bytes(b'x' * 10)
+    assert file_hash(fname, blocksize=3) == file_hash(fname)
@@ -0,0 +1,105 @@
+"""
+Tests for the map titles and the sidecar state of the map outputs.
+"""
+
+import geopandas
+import pytest
+from shapely.geometry import box
+
+from cophub.layers import layer_metadata, write_layer
+from cophub.count_overlaps import output_fname
+from cophub.maps import (STATE_FNAME, load_state, map_title,
+                         monthly_coverage, render_state, save_state)
+
+S1_PARAMS = ["startDate=2018-01-01", "completionDate=2018-02-01",
+             "productType=GRD", "sensorMode=IW",
+             "orbitDirection=Ascending"]
+
+
+def test_map_title():
+    s1 = layer_metadata("S1", S1_PARAMS)
+    assert map_title(s1) == "S1 GRD IW Ascending 2018-01"
+
+    s2 = layer_metadata("S2", ["startDate=2018-01-01",
+                               "completionDate=2018-03-01",
+                               "productType=S2MSI1C"])
+    assert map_title(s2) == "S2 S2MSI1C 2018-01 to 2018-02"
+
+    # merged layers lacking the metadata of their collection's title
+    merged = {'collection': 'S1', 'startDate': '2018-01-01'}
+    assert map_title(merged) == "S1 2018-01"
+    assert map_title({}, 'merged') == 'merged'
+
+
+def test_state_round_trip(tmp_path):
+    fname = tmp_path.joinpath(STATE_FNAME)
+    assert load_state(fname) == {}
+
+    layer = tmp_path.joinpath('x.geojson')
+    layer.write_text('{}')
+    state = {layer.name: render_state(layer, None, {'dpi': 100})}
+    save_state(state, fname)
+
+    assert load_state(fname) == state
+    assert list(tmp_path.glob('*.tmp')) == []
+
+    fname.write_text('{"truncated')
+    assert load_state(fname) == {}
+
+
+def test_render_state(tmp_path):
+    layer = tmp_path.joinpath('x.geojson')
+    layer.write_text('{}')
+    state = render_state(layer, None, {'dpi': 100})
+
+    assert state == render_state(layer, None, {'dpi': 100})
+    assert state != render_state(layer, 'abc', {'dpi': 100})
+    assert state != render_state(layer, None, {'dpi': 200})
+
+    layer.write_text('{"type": "FeatureCollection"}')
+    assert state != render_state(layer, None, {'dpi': 100})
+
+
+@pytest.fixture
+def indir(tmp_path):
+    indir = tmp_path.joinpath('layers')
+    indir.mkdir()
+    gdf = geopandas.GeoDataFrame({'fid': [0], 'observations': [2]},
+                                 geometry=[box(130, -30, 132, -28)],
+                                 crs='EPSG:4326')
+    write_layer(gdf, output_fname(indir, "S1", S1_PARAMS),
+                metadata=layer_metadata("S1", S1_PARAMS))
+
+    return indir
+
+
+def test_monthly_coverage_one_format_per_stem(indir, tmp_path):
+    pytest.importorskip('cartopy')
+    outdir = tmp_path.joinpath('maps')
+
+    # the same layer in another format maps to the same PNG
+    for fname in indir.glob('*.geojson'):
+        gdf = geopandas.read_file(str(fname))
+        write_layer(gdf, fname.with_suffix('.parquet'))
+
+    rendered = monthly_coverage(indir, outdir, render_mode='raster')
+    assert len(rendered) == 1
+
+    state = load_state(outdir.joinpath(STATE_FNAME))
+    assert [name[-8:] for name in state] == ['.geojson']
+
+
+def test_monthly_coverage_skips_current(indir, tmp_path):
+    pytest.importorskip('cartopy')
+    outdir = tmp_path.joinpath('maps')
+
+    rendered = monthly_coverage(indir, outdir, render_mode='raster')
+    assert len(rendered) == 1
+    assert rendered[0].exists()
+
+    assert monthly_coverage(indir, outdir, render_mode='raster') == []
+    assert len(monthly_coverage(indir, outdir, render_mode='raster',
+                                force=True)) == 1
+
+    # a change of the rendering parameters renders the map once more
+    assert len(monthly_coverage(indir, outdir)) == 1
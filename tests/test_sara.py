@@ -0,0 +1,116 @@
+"""
+Tests for the paging of `sara.iter_query`, against the SARA stand-in
+served from scripts/sara_standin.py.
+"""
+
+from pathlib import Path
+import sys
+
+import pytest
+
+# auscophub is stood in by conftest.py if it isn't installed
+from auscophub import saraclient
+from cophub.sara import iter_query
+
+sys.path.insert(0, str(Path(__file__).parents[1].joinpath('scripts')))
+from sara_standin import serve  # noqa: E402
+
+
+def features(n):
+    """
+    A list of `n` point features, each identified by its index.
+    """
+    return [{"type": "Feature",
+             "geometry": {"type": "Point", "coordinates": [i % 180, 0]},
+             "properties": {"id": i}} for i in range(n)]
+
+
+@pytest.fixture
+def requests(monkeypatch):
+    """
+    Record the URL of every page requested from the stand-in.
+    """
+    urls = []
+    read = saraclient.readJsonUrl
+
+    def record(url_opener, url):
+        urls.append(url)
+        return read(url_opener, url)
+
+    monkeypatch.setattr(saraclient, 'readJsonUrl', record)
+
+    return urls
+
+
+def ids(pages):
+    return [f['properties']['id'] for page in pages for f in page]
+
+
+def test_exact_multiple_of_page_size(requests):
+    server, url = serve(features(1000))
+    try:
+        pages = list(iter_query("S1", [], url=url, page_size=500))
+    finally:
+        server.shutdown()
+
+    assert [len(p) for p in pages] == [500, 500]
+    assert ids(pages) == list(range(1000))
+    # the reported totalResults ends the paging without an empty page
+    assert len(requests) == 2
+
+
+def test_empty_last_page(requests, monkeypatch):
+    read = saraclient.readJsonUrl
+
+    def without_total(url_opener, url):
+        result, err = read(url_opener, url)
+        result['properties'].pop('totalResults')
+        return result, err
+
+    monkeypatch.setattr(saraclient, 'readJsonUrl', without_total)
+
+    server, url = serve(features(1000))
+    try:
+        pages = list(iter_query("S1", [], url=url, page_size=500))
+    finally:
+        server.shutdown()
+
+    # the empty third page ends the paging, and is not yielded
+    assert [len(p) for p in pages] == [500, 500]
+    assert ids(pages) == list(range(1000))
+    assert len(requests) == 3
+
+
+def test_no_results(requests):
+    server, url = serve(features(0))
+    try:
+        pages = list(iter_query("S1", [], url=url, page_size=500))
+    finally:
+        server.shutdown()
+
+    assert pages == []
+    assert len(requests) == 1
+
+
+def test_partial_last_page(requests):
+    server, url = serve(features(1050))
+    try:
+        pages = list(iter_query("S1", [], url=url, page_size=500))
+    finally:
+        server.shutdown()
+
+    assert [len(p) for p in pages] == [500, 500, 50]
+    assert ids(pages) == list(range(1050))
+
+
+def test_max_records_truncation(requests):
+    # the server caps maxRecords below the requested page size
+    server, url = serve(features(1050), max_records=100)
+    try:
+        pages = list(iter_query("S1", [], url=url, page_size=500))
+    finally:
+        server.shutdown()
+
+    assert [len(p) for p in pages] == [100] * 10 + [50]
+    assert ids(pages) == list(range(1050))
+    assert all('maxRecords=500' in u for u in requests)
@@ -0,0 +1,105 @@
+"""
+Check that simplifying a count layer keeps its pieces free of gaps
+and overlaps.
+"""
+
+import numpy
+import geopandas
+import pytest
+from shapely.geometry import Polygon, box
+from shapely.ops import unary_union
+
+from cophub.simplify import (Reduction, remove_slivers, simplify_layer,
+                             summary, vertices)
+
+
+def wiggly_layer():
+    """
+    Four pieces sharing finely noded, slightly wiggly boundaries.
+    """
+    xs = numpy.linspace(0, 2, 201)
+    wiggle = 0.001 * numpy.sin(xs * 50)
+
+    # a wiggly horizontal boundary at y=1, and one vertical at x=1
+    lower_y = list(zip(xs, 1 + wiggle))
+    pieces = [
+        Polygon([(0, 0), (1, 0)] + [(x, y) for x, y in lower_y[::-1]
+                                    if x <= 1]),
+        Polygon([(1, 0), (2, 0)] + [(x, y) for x, y in lower_y[::-1]
+                                    if x >= 1]),
+        Polygon([(x, y) for x, y in lower_y if x <= 1] + [(1, 2), (0, 2)]),
+        Polygon([(x, y) for x, y in lower_y if x >= 1] + [(2, 2), (1, 2)]),
+    ]
+
+    return geopandas.GeoDataFrame({'fid': range(4),
+                                   'observations': [1, 2, 3, 4]},
+                                  geometry=pieces, crs='EPSG:4326')
+
+
+def areas(layer):
+    return sum(g.area for g in layer.geometry)
+
+
+def test_simplify_layer():
+    layer = wiggly_layer()
+    assert all(g.is_valid for g in layer.geometry)
+
+    simplified, reduction = simplify_layer(layer, tolerance=0.01)
+
+    assert reduction.pieces_before == reduction.pieces_after == 4
+    assert reduction.vertices_after < reduction.vertices_before / 10
+    assert reduction.vertices_after == sum(vertices(g)
+                                           for g in simplified.geometry)
+
+    # no gaps or overlaps between the neighbouring pieces
+    union = unary_union(list(simplified.geometry))
+    assert areas(simplified) == pytest.approx(union.area)
+    assert union.area == pytest.approx(4.0)
+    assert sorted(simplified['observations']) == [1, 2, 3, 4]
+    assert list(simplified['fid']) == [0, 1, 2, 3]
+
+
+def test_precision():
+    simplified, _ = simplify_layer(wiggly_layer(), precision=2)
+
+    coords = numpy.concatenate([numpy.asarray(g.exterior.coords)
+                                for g in simplified.geometry])
+    assert numpy.allclose(coords, numpy.round(coords, 2))
+
+    union = unary_union(list(simplified.geometry))
+    assert areas(simplified) == pytest.approx(union.area)
+
+
+def test_remove_slivers():
+    pieces = [box(0, 0.5, 1, 1), box(1, 0, 1.001, 1), box(1.001, 0, 3, 1)]
+    layer = geopandas.GeoDataFrame({'fid': range(3),
+                                    'observations': [1, 2, 3]},
+                                   geometry=pieces, crs='EPSG:4326')
+
+    merged = remove_slivers(layer, min_area=0.01)
+    assert list(merged['observations']) == [1, 3]
+    assert areas(merged) == pytest.approx(2.5)
+    # merged into the neighbour sharing the longest boundary
+    assert merged.geometry.iloc[1].area == pytest.approx(2.0)
+
+    dropped = remove_slivers(layer, min_area=0.01, drop=True)
+    assert list(dropped['observations']) == [1, 3]
+    assert areas(dropped) == pytest.approx(2.499)
+
+
+def test_unchanged():
+    layer = wiggly_layer()
+    simplified, reduction = simplify_layer(layer)
+
+    assert simplified is layer
+    assert reduction.vertices_before == reduction.vertices_after
+
+
+def test_summary():
+    reduction = Reduction(10, 8, 200, 50)
+    assert summary(reduction) == ("pieces: 10 -> 8, vertices: 200 -> 50 "
+                                  "(75.0% fewer)")
+
+    reduction = reduction._replace(bytes_before=1000, bytes_after=400)
+    assert summary(reduction).endswith(
+        ", size: 1000 -> 400 bytes (60.0% smaller)")
@@ -0,0 +1,178 @@
+"""
+Tests for the S1 SLC annotation parsing and footprint layers, using
+small synthetic product zips.
+"""
+
+import os
+import zipfile
+
+import pytest
+
+from cophub.slc import (FIELDS, FOOTPRINT_FORMATS, FootprintWriter,
+                        annotation_details, name_details, parse_annotation,
+                        product_record, relative_orbit, slc_footprints)
+
+ANNOTATION = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<product><adsHeader><missionId>S1A</missionId>'
+    '<productType>SLC</productType><polarisation>{pol}</polarisation>'
+    '<mode>{mode}</mode><swath>{swath}</swath>'
+    '<startTime>2018-01-0{day}T10:10:{start:02d}.000000</startTime>'
+    '<stopTime>2018-01-0{day}T10:10:{stop:02d}.500000</stopTime>'
+    '<absoluteOrbitNumber>{orbit}</absoluteOrbitNumber>'
+    '<missionDataTakeId>140000</missionDataTakeId></adsHeader>'
+    '<generalAnnotation><productInformation><pass>{orient}</pass>'
+    '</productInformation></generalAnnotation>'
+    '<geolocationGrid/></product>')
+
+KML = ('<?xml version="1.0"?><kml><Document><Folder><GroundOverlay>'
+       '<gx:LatLonQuad xmlns:gx="http://www.google.com/kml/ext/2.2">'
+       '<coordinates>{0},-30 {1},-30.5 {1},-32 {0},-31.5</coordinates>'
+       '</gx:LatLonQuad></GroundOverlay></Folder></Document></kml>')
+
+
+def make_product(outdir, i, mode='IW', pols=('VV', 'VH'),
+                 orient='Ascending'):
+    """
+    Write a synthetic SLC product zip, containing only the annotation
+    XML and preview KML members read by `cophub.slc`.
+    """
+    day = 1 + i % 9
+    date = '2018010{}'.format(day)
+    base = 'S1A_{}_SLC__1SDV_{}T101010_{}T101037_020000_022{:03X}_{:04X}'
+    base = base.format(mode, date, date, i, i)
+    safe = base + '.SAFE'
+    swaths = ['iw1', 'iw2', 'iw3'] if mode == 'IW' else ['s1']
+
+    with zipfile.ZipFile(os.path.join(str(outdir), base + '.zip'), 'w') as z:
+        k = 1
+        for pol in pols:
+            for swath in swaths:
+                name = 's1a-{}-slc-{}-{}-{:03d}.xml'.format(
+                    swath, pol.lower(), date, k)
+                z.writestr(safe + '/annotation/' + name, ANNOTATION.format(
+                    pol=pol, mode=mode, swath=swath.upper(), day=day,
+                    start=k, stop=k + 20, orbit=20000 + i, orient=orient))
+                z.writestr(safe + '/annotation/calibration/' + name, '<x/>')
+                k += 1
+        lon = 130.0 + i * 0.1
+        z.writestr(safe + '/preview/map-overlay.kml', KML.format(lon,
+                                                                 lon + 2.5))
+
+    return base + '.zip'
+
+
+@pytest.fixture
+def archive(tmp_path):
+    """
+    A synthetic SLC archive of 5 products, and its zip list.
+    """
+    sar_dir = tmp_path.joinpath('sar')
+    grid_dir = sar_dir.joinpath('2018', '2018-01', 'grid')
+    grid_dir.mkdir(parents=True)
+
+    names = [make_product(grid_dir, i) for i in range(5)]
+    zip_list = tmp_path.joinpath('S1_IW_SLC_2018-01_zips.list')
+    zip_list.write_text(''.join('x grid {}\n'.format(n) for n in names))
+
+    return sar_dir, zip_list, names
+
+
+def test_parse_annotation():
+    data = ANNOTATION.format(pol='VV', mode='IW', swath='IW1', day=1,
+                             start=1, stop=21, orbit=20000,
+                             orient='Ascending').encode('utf-8')
+    found = parse_annotation(data, ('mode', 'pass', 'missing'))
+
+    assert found == {'mode': 'IW', 'pass': 'Ascending'}
+
+
+def test_empty_annotation_values():
+    data = ANNOTATION.format(pol='VV', mode='SM', swath='S1', day=1,
+                             start=1, stop=21, orbit=20000,
+                             orient='Ascending')
+    data = data.replace('<startTime>2018-01-01T10:10:01.000000</startTime>',
+                        '<startTime/>')
+    data = data.replace('<pass>Ascending</pass>', '<pass> </pass>')
+
+    found = parse_annotation(data.encode('utf-8'), ('startTime', 'pass'))
+    assert found == {'startTime': '', 'pass': ''}
+
+    details = annotation_details({'s1a-s1-slc-vv-20180101-001.xml':
+                                  data.encode('utf-8')})
+    assert details['start_time'] == ''
+    assert details['orient'] == ''
+    assert details['stop_time'] == '10:10:21.500000'
+
+
+def test_annotation_details(tmp_path):
+    zip_name = make_product(tmp_path, 3, pols=('HH', 'HV'))
+    with zipfile.ZipFile(str(tmp_path.joinpath(zip_name))) as src:
+        annotations = {os.path.basename(n): src.read(n)
+                       for n in src.namelist()
+                       if '/annotation/s1a' in n}
+
+    details = annotation_details(annotations)
+
+    assert details['polar'] == 'HH-HV'
+    assert details['mode_beam'] == 'IW'
+    assert details['start_time'] == '10:10:01.000000'
+    # the stop time of the last swath of the first polarisation
+    assert details['stop_time'] == '10:10:23.500000'
+
+
+def test_name_details():
+    details = name_details(
+        'S1A_IW_SLC__1SDV_20180101T101010_20180101T101037_020000_022000_'
+        '0A1B.zip')
+
+    assert details == {'date': '20180101', 'unique_product_id': '0A1B',
+                       'resolution_class': '-', 'processing_level': '1',
+                       'product_class': 'Standard'}
+
+
+def test_product_record(tmp_path):
+    zip_name = make_product(tmp_path, 0, orient='Descending')
+    record, parts = product_record(str(tmp_path.joinpath(zip_name)), 'grid')
+
+    assert record.ZipFile == zip_name
+    assert record.GridDir == 'grid'
+    assert record.Pass == 'Descending'
+    assert record.RelOrbit == relative_orbit(20000)
+    assert len(parts) == 1 and len(parts[0]) == 4
+
+
+@pytest.mark.parametrize('fmt', list(FOOTPRINT_FORMATS))
+def test_slc_footprints(tmp_path, archive, fmt):
+    import geopandas
+
+    sar_dir, zip_list, names = archive
+    seen = []
+    out_fname, count = slc_footprints(str(zip_list), str(tmp_path),
+                                      str(sar_dir), workers=2, fmt=fmt,
+                                      batch_size=2, progress=seen.append)
+
+    assert count == 5
+    basename = '2018-01_IW_S1_SLC' + FOOTPRINT_FORMATS[fmt]
+    assert os.path.basename(out_fname) == basename
+    assert [r.ZipFile for r in seen] == names
+
+    if fmt == 'GeoParquet':
+        # no crs recorded, so readers default to lon/lat on WGS84
+        gdf = geopandas.read_parquet(out_fname)
+        assert gdf.crs.to_string() == 'OGC:CRS84'
+    else:
+        gdf = geopandas.read_file(out_fname)
+        assert gdf.crs.to_epsg() == 4326
+
+    # written in the order of the zip list, across several batches
+    assert list(gdf['ZipFile']) == names
+    assert set(FIELDS) <= set(gdf.columns)
+    if fmt != 'Shapefile':
+        # only the dbf truncates the times
+        assert list(gdf['StartTime'])[0] == '10:10:01.000000'
+
+
+def test_writer_unsupported(tmp_path):
+    with pytest.raises(ValueError):
+        FootprintWriter(tmp_path.joinpath('x.gpkg'), fmt='KML')